@@ -0,0 +1,35 @@
+"""Per-source ingest watermarks for incremental polling."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingest_watermarks",
+        sa.Column("source", sa.String(), primary_key=True),
+        sa.Column("last_published_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("cursor", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+    # Seed from what is already stored so the first incremental run does not
+    # re-request the whole window.
+    op.execute(
+        """
+        INSERT INTO ingest_watermarks (source, last_published_at, cursor)
+        SELECT DISTINCT ON (source) source, published_at, source_item_id
+        FROM raw_updates
+        ORDER BY source, published_at DESC, source_item_id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ingest_watermarks")
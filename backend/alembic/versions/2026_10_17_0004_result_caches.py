@@ -0,0 +1,36 @@
+"""Content-hash keyed caches for clean and classification results."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "clean_cache",
+        sa.Column("content_key", sa.String(), primary_key=True),
+        sa.Column("cleaned_text", sa.Text(), nullable=False),
+        sa.Column("cleaned_hash", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+    op.create_table(
+        "classification_cache",
+        sa.Column("cleaned_hash", sa.String(), primary_key=True),
+        sa.Column("rules_fingerprint", sa.String(), primary_key=True),
+        sa.Column("mode", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("urgency", sa.String(), nullable=False),
+        sa.Column("action_type", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("classification_cache")
+    op.drop_table("clean_cache")
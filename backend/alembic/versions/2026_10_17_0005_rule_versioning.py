@@ -0,0 +1,39 @@
+"""Rule-set fingerprints on cards and a pattern-to-document index."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing cards keep a NULL fingerprint: unknown rules, fully re-extracted.
+    op.add_column("cards", sa.Column("rules_fingerprint", sa.String(), nullable=True))
+    op.create_index("ix_cards_rules_fingerprint", "cards", ["rules_fingerprint"])
+
+    op.create_table(
+        "rule_sets",
+        sa.Column("fingerprint", sa.String(), primary_key=True),
+        sa.Column("rules", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+    op.create_table(
+        "rule_pattern_hits",
+        sa.Column("pattern_key", sa.String(), primary_key=True),
+        sa.Column("cleaned_hash", sa.String(), primary_key=True),
+    )
+
+    # Cached classifications were written without index rows; rebuild both.
+    op.execute("TRUNCATE classification_cache")
+
+
+def downgrade() -> None:
+    op.drop_table("rule_pattern_hits")
+    op.drop_table("rule_sets")
+    op.drop_index("ix_cards_rules_fingerprint", table_name="cards")
+    op.drop_column("cards", "rules_fingerprint")
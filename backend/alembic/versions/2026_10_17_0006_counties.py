@@ -0,0 +1,102 @@
+"""County dimension table in place of the card_county enum."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+COUNTIES = [
+    ("alachua", "Alachua"),
+    ("baker", "Baker"),
+    ("bay", "Bay"),
+    ("bradford", "Bradford"),
+    ("brevard", "Brevard"),
+    ("broward", "Broward"),
+    ("calhoun", "Calhoun"),
+    ("charlotte", "Charlotte"),
+    ("citrus", "Citrus"),
+    ("clay", "Clay"),
+    ("collier", "Collier"),
+    ("columbia", "Columbia"),
+    ("desoto", "DeSoto"),
+    ("dixie", "Dixie"),
+    ("duval", "Duval"),
+    ("escambia", "Escambia"),
+    ("flagler", "Flagler"),
+    ("franklin", "Franklin"),
+    ("gadsden", "Gadsden"),
+    ("gilchrist", "Gilchrist"),
+    ("glades", "Glades"),
+    ("gulf", "Gulf"),
+    ("hamilton", "Hamilton"),
+    ("hardee", "Hardee"),
+    ("hendry", "Hendry"),
+    ("hernando", "Hernando"),
+    ("highlands", "Highlands"),
+    ("hillsborough", "Hillsborough"),
+    ("holmes", "Holmes"),
+    ("indian-river", "Indian River"),
+    ("jackson", "Jackson"),
+    ("jefferson", "Jefferson"),
+    ("lafayette", "Lafayette"),
+    ("lake", "Lake"),
+    ("lee", "Lee"),
+    ("leon", "Leon"),
+    ("levy", "Levy"),
+    ("liberty", "Liberty"),
+    ("madison", "Madison"),
+    ("manatee", "Manatee"),
+    ("marion", "Marion"),
+    ("martin", "Martin"),
+    ("miami-dade", "Miami-Dade"),
+    ("monroe", "Monroe"),
+    ("nassau", "Nassau"),
+    ("okaloosa", "Okaloosa"),
+    ("okeechobee", "Okeechobee"),
+    ("orange", "Orange"),
+    ("osceola", "Osceola"),
+    ("palm-beach", "Palm Beach"),
+    ("pasco", "Pasco"),
+    ("pinellas", "Pinellas"),
+    ("polk", "Polk"),
+    ("putnam", "Putnam"),
+    ("st-johns", "St. Johns"),
+    ("st-lucie", "St. Lucie"),
+    ("santa-rosa", "Santa Rosa"),
+    ("sarasota", "Sarasota"),
+    ("seminole", "Seminole"),
+    ("sumter", "Sumter"),
+    ("suwannee", "Suwannee"),
+    ("taylor", "Taylor"),
+    ("union", "Union"),
+    ("volusia", "Volusia"),
+    ("wakulla", "Wakulla"),
+    ("walton", "Walton"),
+    ("washington", "Washington"),
+]
+
+
+def upgrade() -> None:
+    counties = op.create_table(
+        "counties",
+        sa.Column("slug", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+    )
+    op.bulk_insert(counties, [{"slug": slug, "name": name} for slug, name in COUNTIES])
+
+    op.alter_column("cards", "county", type_=sa.String(), postgresql_using="county::text")
+    op.create_foreign_key("fk_cards_county", "cards", "counties", ["county"], ["slug"])
+    sa.Enum(name="card_county").drop(op.get_bind(), checkfirst=True)
+
+
+def downgrade() -> None:
+    card_county = sa.Enum("broward", "miami-dade", name="card_county")
+    card_county.create(op.get_bind(), checkfirst=True)
+    op.drop_constraint("fk_cards_county", "cards", type_="foreignkey")
+    op.execute("DELETE FROM cards WHERE county NOT IN ('broward', 'miami-dade')")
+    op.alter_column("cards", "county", type_=card_county, postgresql_using="county::card_county")
+    op.drop_table("counties")
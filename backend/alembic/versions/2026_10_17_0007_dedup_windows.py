@@ -0,0 +1,40 @@
+"""Dedup windows on duplicate_groups for incremental grouping."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("duplicate_groups", sa.Column("window_start", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("duplicate_groups", sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=True))
+
+    # A group's window opens at its earliest card; groups left without cards
+    # keep NULL bounds and are never matched again.
+    op.execute(
+        """
+        UPDATE duplicate_groups AS g
+        SET window_start = s.first_seen, last_seen_at = s.last_seen
+        FROM (
+            SELECT duplicate_group_id, min(published_at) AS first_seen, max(published_at) AS last_seen
+            FROM cards
+            WHERE duplicate_group_id IS NOT NULL
+            GROUP BY duplicate_group_id
+        ) AS s
+        WHERE g.id = s.duplicate_group_id
+        """
+    )
+    op.create_index(
+        "ix_duplicate_groups_window", "duplicate_groups", ["signature", "window_start", "last_seen_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_duplicate_groups_window", table_name="duplicate_groups")
+    op.drop_column("duplicate_groups", "last_seen_at")
+    op.drop_column("duplicate_groups", "window_start")
@@ -0,0 +1,22 @@
+"""MinHash sketches of cleaned text for near-duplicate dedup."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "minhash_signatures",
+        sa.Column("cleaned_hash", sa.String(), primary_key=True),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("minhash_signatures")
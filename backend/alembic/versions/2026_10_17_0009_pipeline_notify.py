@@ -0,0 +1,44 @@
+"""NOTIFY pipeline_<table> when rows land in raw_updates, clean_updates or cards."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+TABLES = ["raw_updates", "clean_updates", "cards"]
+
+
+def upgrade() -> None:
+    # Statement-level, so a bulk insert or COPY sends one notification; the
+    # transition table keeps inserts skipped by ON CONFLICT from waking
+    # anyone. Notifications go out on commit and repeats within a
+    # transaction are folded into one.
+    op.execute(
+        """
+        CREATE FUNCTION notify_pipeline() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM inserted) THEN
+                PERFORM pg_notify('pipeline_' || TG_TABLE_NAME, '');
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_notify AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS inserted
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_pipeline()
+            """
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER {table}_notify ON {table}")
+    op.execute("DROP FUNCTION notify_pipeline()")
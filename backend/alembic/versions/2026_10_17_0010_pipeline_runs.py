@@ -0,0 +1,29 @@
+"""Structured per-run pipeline metrics."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_runs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("mode", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("wall_seconds", sa.Float(), nullable=False),
+        sa.Column("report", sa.JSON(), nullable=False),
+    )
+    op.create_index("ix_pipeline_runs_started_at", "pipeline_runs", ["started_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pipeline_runs_started_at", table_name="pipeline_runs")
+    op.drop_table("pipeline_runs")
@@ -0,0 +1,86 @@
+"""Work queue for clean and extract, claimed with FOR UPDATE SKIP LOCKED."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+# Table whose inserts queue work, and the stage that work is for.
+QUEUED = [("raw_updates", "clean"), ("clean_updates", "extract")]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "work_queue",
+        sa.Column("stage", sa.String(), primary_key=True),
+        sa.Column("item_id", sa.String(), primary_key=True),
+        sa.Column("bucket", sa.Integer(), sa.Computed("hashtext(item_id) & 1023", persisted=True), nullable=False),
+        sa.Column("parked_under", sa.String(), nullable=True),
+        sa.Column("enqueued_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_work_queue_claim",
+        "work_queue",
+        ["stage", "bucket"],
+        unique=False,
+        postgresql_where=sa.text("parked_under IS NULL"),
+    )
+    op.create_index(
+        "ix_work_queue_parked",
+        "work_queue",
+        ["stage", "parked_under"],
+        unique=False,
+        postgresql_where=sa.text("parked_under IS NOT NULL"),
+    )
+
+    # Statement-level like the notify triggers: one INSERT ... SELECT per
+    # bulk insert, and rows skipped by ON CONFLICT queue nothing.
+    op.execute(
+        """
+        CREATE FUNCTION enqueue_work() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO work_queue (stage, item_id)
+            SELECT TG_ARGV[0], id FROM inserted
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for table, stage in QUEUED:
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_enqueue AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS inserted
+            FOR EACH STATEMENT EXECUTE FUNCTION enqueue_work('{stage}')
+            """
+        )
+
+    # Whatever the anti-joins would have picked up next.
+    op.execute(
+        """
+        INSERT INTO work_queue (stage, item_id)
+        SELECT 'clean', r.id FROM raw_updates r
+        WHERE NOT EXISTS (SELECT 1 FROM clean_updates c WHERE c.raw_update_id = r.id)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO work_queue (stage, item_id)
+        SELECT 'extract', c.id FROM clean_updates c
+        WHERE NOT EXISTS (SELECT 1 FROM cards k WHERE k.clean_update_id = c.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    for table, _ in QUEUED:
+        op.execute(f"DROP TRIGGER {table}_enqueue ON {table}")
+    op.execute("DROP FUNCTION enqueue_work()")
+    op.drop_index("ix_work_queue_parked", table_name="work_queue")
+    op.drop_index("ix_work_queue_claim", table_name="work_queue")
+    op.drop_table("work_queue")
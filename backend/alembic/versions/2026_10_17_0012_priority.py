@@ -0,0 +1,77 @@
+"""Priority-ordered work queue and card creation times."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows already stored keep priority 0: the prescore lives in Python and
+    # only runs as rows land.
+    op.add_column("raw_updates", sa.Column("priority", sa.SmallInteger(), server_default="0", nullable=False))
+    op.add_column("work_queue", sa.Column("priority", sa.SmallInteger(), server_default="0", nullable=False))
+    op.drop_index("ix_work_queue_claim", table_name="work_queue")
+    op.create_index(
+        "ix_work_queue_claim",
+        "work_queue",
+        ["stage", sa.text("priority DESC"), "enqueued_at"],
+        unique=False,
+        postgresql_where=sa.text("parked_under IS NULL"),
+    )
+
+    # Added without a default first so existing cards stay NULL rather than
+    # claiming to have been made now.
+    op.add_column("cards", sa.Column("created_at", sa.DateTime(timezone=True), nullable=True))
+    op.alter_column("cards", "created_at", server_default=sa.func.now())
+
+    # Queued work inherits its raw update's priority.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION enqueue_work() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'raw_updates' THEN
+                INSERT INTO work_queue (stage, item_id, priority)
+                SELECT TG_ARGV[0], i.id, i.priority FROM inserted i
+                ON CONFLICT DO NOTHING;
+            ELSE
+                INSERT INTO work_queue (stage, item_id, priority)
+                SELECT TG_ARGV[0], i.id, r.priority FROM inserted i
+                JOIN raw_updates r ON r.id = i.raw_update_id
+                ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION enqueue_work() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO work_queue (stage, item_id)
+            SELECT TG_ARGV[0], id FROM inserted
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.drop_column("cards", "created_at")
+    op.drop_index("ix_work_queue_claim", table_name="work_queue")
+    op.create_index(
+        "ix_work_queue_claim",
+        "work_queue",
+        ["stage", "bucket"],
+        unique=False,
+        postgresql_where=sa.text("parked_under IS NULL"),
+    )
+    op.drop_column("work_queue", "priority")
+    op.drop_column("raw_updates", "priority")
@@ -0,0 +1,46 @@
+"""Stored urgency rank and composite indexes for the card feed."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+FEED_INDEXES = [
+    ("ix_cards_feed", ["mode", "urgency_rank", "published_at", "id"]),
+    ("ix_cards_feed_county", ["mode", "county", "urgency_rank", "published_at", "id"]),
+    ("ix_cards_feed_category", ["mode", "category", "urgency_rank", "published_at", "id"]),
+    ("ix_cards_feed_recent", ["mode", "published_at", "id"]),
+    ("ix_cards_feed_recent_county", ["mode", "county", "published_at", "id"]),
+    ("ix_cards_feed_recent_category", ["mode", "category", "published_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    op.add_column("cards", sa.Column("urgency_rank", sa.SmallInteger(), nullable=True))
+    op.execute(
+        """
+        UPDATE cards SET urgency_rank = CASE urgency
+            WHEN 'high' THEN 3
+            WHEN 'medium' THEN 2
+            ELSE 1
+        END
+        """
+    )
+    op.alter_column("cards", "urgency_rank", nullable=False)
+
+    for name, columns in FEED_INDEXES:
+        op.create_index(name, "cards", columns, unique=False)
+    # Every feed index leads with mode.
+    op.drop_index("ix_cards_mode", table_name="cards")
+    op.execute("ANALYZE cards")
+
+
+def downgrade() -> None:
+    op.create_index("ix_cards_mode", "cards", ["mode"], unique=False)
+    for name, _ in reversed(FEED_INDEXES):
+        op.drop_index(name, table_name="cards")
+    op.drop_column("cards", "urgency_rank")
@@ -0,0 +1,111 @@
+"""Hourly card counts behind /stats and /summary, kept by triggers on cards."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+KEY = "hour, mode, category, county, urgency"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "card_rollups",
+        sa.Column("hour", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("mode", postgresql.ENUM(name="card_mode", create_type=False), primary_key=True),
+        sa.Column("category", postgresql.ENUM(name="card_category", create_type=False), primary_key=True),
+        sa.Column("county", sa.String(), primary_key=True),
+        sa.Column("urgency", postgresql.ENUM(name="card_urgency", create_type=False), primary_key=True),
+        sa.Column("cards", sa.Integer(), nullable=False),
+    )
+
+    # Statement-level, so a batch of cards costs one upsert per key it
+    # touches. Keys are applied in order so concurrent extract workers lock
+    # shared rollup rows in the same order. Hours are UTC whatever the
+    # session time zone.
+    op.execute(
+        f"""
+        CREATE FUNCTION card_rollups_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO card_rollups AS r ({KEY}, cards)
+                SELECT date_trunc('hour', published_at, 'UTC'), mode, category, county, urgency, -count(*)
+                FROM removed GROUP BY 1, 2, 3, 4, 5 ORDER BY 1, 2, 3, 4, 5
+                ON CONFLICT ({KEY}) DO UPDATE SET cards = r.cards + excluded.cards;
+            ELSE
+                INSERT INTO card_rollups AS r ({KEY}, cards)
+                SELECT date_trunc('hour', published_at, 'UTC'), mode, category, county, urgency, count(*)
+                FROM inserted GROUP BY 1, 2, 3, 4, 5 ORDER BY 1, 2, 3, 4, 5
+                ON CONFLICT ({KEY}) DO UPDATE SET cards = r.cards + excluded.cards;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER cards_rollup_insert AFTER INSERT ON cards
+        REFERENCING NEW TABLE AS inserted
+        FOR EACH STATEMENT EXECUTE FUNCTION card_rollups_apply()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER cards_rollup_delete AFTER DELETE ON cards
+        REFERENCING OLD TABLE AS removed
+        FOR EACH STATEMENT EXECUTE FUNCTION card_rollups_apply()
+        """
+    )
+
+    # Nothing in the pipeline rewrites a counted column in place (reextract
+    # deletes and reinserts, dedup's regrouping sets duplicate_group_id
+    # alone), so a per-row trigger that only fires when one changes is
+    # enough to keep hand edits from skewing the counts. Postgres allows no
+    # transition tables on a trigger with a column list.
+    op.execute(
+        f"""
+        CREATE FUNCTION card_rollups_move() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO card_rollups AS r ({KEY}, cards)
+            VALUES (date_trunc('hour', OLD.published_at, 'UTC'), OLD.mode, OLD.category, OLD.county, OLD.urgency, -1)
+            ON CONFLICT ({KEY}) DO UPDATE SET cards = r.cards + excluded.cards;
+            INSERT INTO card_rollups AS r ({KEY}, cards)
+            VALUES (date_trunc('hour', NEW.published_at, 'UTC'), NEW.mode, NEW.category, NEW.county, NEW.urgency, 1)
+            ON CONFLICT ({KEY}) DO UPDATE SET cards = r.cards + excluded.cards;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER cards_rollup_update AFTER UPDATE OF published_at, mode, category, county, urgency ON cards
+        FOR EACH ROW
+        WHEN ((OLD.published_at, OLD.mode, OLD.category, OLD.county, OLD.urgency)
+              IS DISTINCT FROM (NEW.published_at, NEW.mode, NEW.category, NEW.county, NEW.urgency))
+        EXECUTE FUNCTION card_rollups_move()
+        """
+    )
+
+    op.execute(
+        f"""
+        INSERT INTO card_rollups ({KEY}, cards)
+        SELECT date_trunc('hour', published_at, 'UTC'), mode, category, county, urgency, count(*)
+        FROM cards GROUP BY 1, 2, 3, 4, 5
+        """
+    )
+    op.execute("ANALYZE card_rollups")
+
+
+def downgrade() -> None:
+    for trigger in ("cards_rollup_insert", "cards_rollup_delete", "cards_rollup_update"):
+        op.execute(f"DROP TRIGGER {trigger} ON cards")
+    op.execute("DROP FUNCTION card_rollups_move()")
+    op.execute("DROP FUNCTION card_rollups_apply()")
+    op.drop_table("card_rollups")
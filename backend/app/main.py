@@ -1,15 +1,133 @@
-﻿from datetime import datetime
-from typing import List, Optional
+﻿import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import case, func
+from sqlalchemy import func, select, tuple_, union_all
 from sqlalchemy.orm import Session
 
 from backend.app import models
 from backend.app.db import get_db
 
 
+def card_feed(
+    db: Session,
+    mode: str,
+    county: Optional[str] = None,
+    category: Optional[str] = None,
+    urgency: Optional[str] = None,
+    start_dt: Optional[datetime] = None,
+    end_dt: Optional[datetime] = None,
+    after: Optional[Tuple[int, datetime, str]] = None,
+    limit: int = 30,
+    offset: int = 0,
+):
+    # One page of /cards, as a deferred join: the page's ids come from an
+    # index-only top-N scan of the ix_cards_feed_* index matching the filter
+    # and sort shape (migration 0013), and only those rows are then read
+    # from the table. backend/check_query_plans.py checks the plans.
+    conditions = [models.Card.mode == mode]
+    if county:
+        conditions.append(models.Card.county == county)
+    if category:
+        conditions.append(models.Card.category == category)
+    if urgency:
+        # By rank rather than label, so the index's rank column takes it.
+        conditions.append(models.Card.urgency_rank == models.URGENCY_RANK[urgency])
+    if start_dt:
+        conditions.append(models.Card.published_at >= start_dt)
+    if end_dt:
+        conditions.append(models.Card.published_at <= end_dt)
+
+    # id breaks ties so the order, and so every cursor, is total.
+    if mode == "action":
+        key = [models.Card.urgency_rank, models.Card.published_at, models.Card.id]
+    else:
+        key = [models.Card.published_at, models.Card.id]
+    if after:
+        after_rank, after_published, after_id = after
+        bound = [after_rank, after_published, after_id] if mode == "action" else [after_published, after_id]
+        conditions.append(tuple_(*key) < tuple_(*bound))
+
+    page = (
+        select(*key)
+        .where(*conditions)
+        .order_by(*[column.desc() for column in key])
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    return (
+        db.query(models.Card)
+        .join(page, page.c.id == models.Card.id)
+        .order_by(*[page.c[column.key].desc() for column in key])
+    )
+
+
+def card_counts(
+    db: Session, start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None
+) -> Dict[str, Dict[str, int]]:
+    # Cards published in [start_dt, end_dt] counted by mode, category,
+    # county and urgency, in one query. Whole UTC hours are read from
+    # card_rollups (migration 0014), so the cost follows the length of the
+    # range rather than the size of cards; only the part hours at either
+    # end are counted from cards themselves.
+    rollup, card = models.CardRollup, models.Card
+    card_keys = [card.mode, card.category, card.county, card.urgency]
+
+    def counted(*conditions):
+        return select(*card_keys, func.count().label("cards")).where(*conditions).group_by(*card_keys)
+
+    def to_hour(ts: datetime) -> datetime:
+        return ts.replace(minute=0, second=0, microsecond=0)
+
+    # Naive timestamps are taken as UTC.
+    if start_dt and start_dt.tzinfo is None:
+        start_dt = start_dt.replace(tzinfo=timezone.utc)
+    if end_dt and end_dt.tzinfo is None:
+        end_dt = end_dt.replace(tzinfo=timezone.utc)
+
+    first_hour = None
+    if start_dt:
+        first_hour = to_hour(start_dt.astimezone(timezone.utc))
+        if first_hour < start_dt:
+            first_hour += timedelta(hours=1)
+    last_hour = to_hour(end_dt.astimezone(timezone.utc)) if end_dt else None
+
+    if first_hour and last_hour and first_hour > last_hour:
+        parts = [counted(card.published_at >= start_dt, card.published_at <= end_dt)]
+    else:
+        hours = select(rollup.mode, rollup.category, rollup.county, rollup.urgency, rollup.cards)
+        if first_hour:
+            hours = hours.where(rollup.hour >= first_hour)
+        if last_hour:
+            hours = hours.where(rollup.hour < last_hour)
+        parts = [hours]
+        if start_dt and start_dt < first_hour:
+            parts.append(counted(card.published_at >= start_dt, card.published_at < first_hour))
+        if end_dt:
+            parts.append(counted(card.published_at >= last_hour, card.published_at <= end_dt))
+
+    counts = union_all(*parts).subquery()
+    dimensions = ["mode", "category", "county", "urgency"]
+    total = func.sum(counts.c.cards)
+    rows = db.execute(
+        select(*[counts.c[name] for name in dimensions], total)
+        .group_by(func.grouping_sets(*[counts.c[name] for name in dimensions]))
+        .having(total > 0)
+    ).all()
+
+    # Each row belongs to one grouping set; the other keys come back null.
+    result: Dict[str, Dict[str, int]] = {name: {} for name in dimensions}
+    for row in rows:
+        for name, value in zip(dimensions, row):
+            if value is not None:
+                result[name][value] = int(row[-1])
+    return result
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title="Hurricane Impact Triage System API", version="0.1.0")
 
@@ -19,6 +137,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
     @app.get("/health")
@@ -33,44 +152,54 @@ def create_app() -> FastAPI:
         except Exception as exc:
             raise HTTPException(status_code=400, detail=f"Invalid timestamp: {ts}") from exc
 
+    # Cursors are opaque to clients: urlsafe base64 of the last card's
+    # [urgency rank, published_at, id], the full sort key of /cards.
+    def encode_cursor(rank: int, published_at: datetime, card_id: str) -> str:
+        raw = json.dumps([rank, published_at.isoformat(), card_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(cursor: str) -> Tuple[int, datetime, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            rank, published_at, card_id = json.loads(raw)
+            return int(rank), datetime.fromisoformat(published_at), str(card_id)
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+    @app.get("/counties")
+    async def counties(db: Session = Depends(get_db)):
+        rows = db.query(models.County).order_by(models.County.name).all()
+        return [{"slug": row.slug, "name": row.name} for row in rows]
+
     @app.get("/cards")
     async def get_cards(
+        response: Response,
         mode: str = Query(..., pattern="^(action|info)$"),
         county: Optional[str] = Query(None),
         category: Optional[str] = Query(None),
-        urgency: Optional[str] = Query(None),
+        urgency: Optional[str] = Query(None, pattern="^(high|medium|low)$"),
         from_ts: Optional[str] = Query(None, alias="from"),
         to_ts: Optional[str] = Query(None, alias="to"),
         limit: int = Query(30, ge=1, le=30),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None),
         db: Session = Depends(get_db),
     ):
-        q = db.query(models.Card).filter(models.Card.mode == mode)
-        if county:
-            q = q.filter(models.Card.county == county)
-        if category:
-            q = q.filter(models.Card.category == category)
-        if urgency:
-            q = q.filter(models.Card.urgency == urgency)
+        # Pages continue from the X-Next-Cursor header of the previous one
+        # (absent on the last page). Seeking past the cursor keeps every
+        # page as cheap as the first, and cards landing meanwhile neither
+        # shift nor repeat rows. offset is still accepted on its own.
+        if cursor and offset:
+            raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
 
-        start_dt = parse_ts(from_ts)
-        end_dt = parse_ts(to_ts)
-        if start_dt:
-            q = q.filter(models.Card.published_at >= start_dt)
-        if end_dt:
-            q = q.filter(models.Card.published_at <= end_dt)
-
-        if mode == "action":
-            urgency_order = case(
-                (models.Card.urgency == "high", 3),
-                (models.Card.urgency == "medium", 2),
-                else_=1,
-            )
-            q = q.order_by(urgency_order.desc(), models.Card.published_at.desc())
-        else:
-            q = q.order_by(models.Card.published_at.desc())
-
-        records: List[models.Card] = q.offset(offset).limit(limit).all()
+        after = decode_cursor(cursor) if cursor else None
+        rows: List[models.Card] = card_feed(
+            db, mode, county, category, urgency, parse_ts(from_ts), parse_ts(to_ts), after, limit + 1, offset
+        ).all()
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last.urgency_rank, last.published_at, last.id)
+        records = rows[:limit]
         return [
             {
                 "id": c.id,
@@ -96,35 +225,11 @@ def create_app() -> FastAPI:
         to_ts: Optional[str] = Query(None, alias="to"),
         db: Session = Depends(get_db),
     ):
-        start_dt = parse_ts(from_ts)
-        end_dt = parse_ts(to_ts)
-
-        base = db.query(models.Card)
-        if start_dt:
-            base = base.filter(models.Card.published_at >= start_dt)
-        if end_dt:
-            base = base.filter(models.Card.published_at <= end_dt)
-
-        by_category = (
-            base.with_entities(models.Card.category, func.count().label("count"))
-            .group_by(models.Card.category)
-            .all()
-        )
-        by_county = (
-            base.with_entities(models.Card.county, func.count().label("count"))
-            .group_by(models.Card.county)
-            .all()
-        )
-        by_urgency = (
-            base.with_entities(models.Card.urgency, func.count().label("count"))
-            .group_by(models.Card.urgency)
-            .all()
-        )
-
+        counts = card_counts(db, parse_ts(from_ts), parse_ts(to_ts))
         return {
-            "category": {row.category: row.count for row in by_category},
-            "county": {row.county: row.count for row in by_county},
-            "urgency": {row.urgency: row.count for row in by_urgency},
+            "category": counts["category"],
+            "county": counts["county"],
+            "urgency": counts["urgency"],
         }
 
     @app.get("/summary")
@@ -136,41 +241,19 @@ def create_app() -> FastAPI:
         start_dt = parse_ts(from_ts)
         end_dt = parse_ts(to_ts)
 
-        base = db.query(models.Card)
-        if start_dt:
-            base = base.filter(models.Card.published_at >= start_dt)
-        if end_dt:
-            base = base.filter(models.Card.published_at <= end_dt)
-
-        urgency_order = case(
-            (models.Card.urgency == "high", 3),
-            (models.Card.urgency == "medium", 2),
-            else_=1,
-        )
-        top_actions = (
-            base.filter(models.Card.mode == "action")
-            .order_by(urgency_order.desc(), models.Card.published_at.desc())
-            .limit(5)
-            .all()
-        )
-
-        cat_counts = (
-            base.with_entities(models.Card.category, func.count().label("count"))
-            .group_by(models.Card.category)
-            .order_by(func.count().desc())
-            .limit(3)
-            .all()
-        )
-
-        action_count = base.filter(models.Card.mode == "action").count()
-        info_count = base.filter(models.Card.mode == "info").count()
+        top_actions = card_feed(db, "action", start_dt=start_dt, end_dt=end_dt, limit=5).all()
+
+        counts = card_counts(db, start_dt, end_dt)
+        cat_counts = sorted(counts["category"].items(), key=lambda item: item[1], reverse=True)[:3]
+        action_count = counts["mode"].get("action", 0)
+        info_count = counts["mode"].get("info", 0)
 
         summary_text = []
         if top_actions:
             summary_text.append(f"Top urgent actions: {', '.join([c.title for c in top_actions])}")
         if cat_counts:
             summary_text.append(
-                "Leading categories: " + ", ".join([f"{row.category} ({row.count})" for row in cat_counts])
+                "Leading categories: " + ", ".join([f"{category} ({count})" for category, count in cat_counts])
             )
         summary_text.append(f"Totals - action: {action_count}, info: {info_count}")
 
@@ -186,7 +269,7 @@ def create_app() -> FastAPI:
                 }
                 for c in top_actions
             ],
-            "leading_categories": [{"category": row.category, "count": row.count} for row in cat_counts],
+            "leading_categories": [{"category": category, "count": count} for category, count in cat_counts],
             "totals": {"action": action_count, "info": info_count},
             "summary_text": " | ".join(summary_text),
         }
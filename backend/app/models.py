@@ -4,14 +4,21 @@ from typing import Optional
 from sqlalchemy import (
     CheckConstraint,
     Column,
+    Computed,
     DateTime,
     Enum,
+    Float,
     ForeignKey,
     Index,
+    Integer,
+    JSON,
+    LargeBinary,
+    SmallInteger,
     String,
     Text,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -30,6 +37,8 @@ class RawUpdate(Base):
     raw_text = Column(Text, nullable=False)
     raw_html = Column(Text, nullable=True)
     content_hash = Column(String, nullable=False)
+    # pipeline.priority.prescore at landing; orders the work queues.
+    priority = Column(SmallInteger, server_default="0", nullable=False)
 
     __table_args__ = (
         UniqueConstraint("source", "source_url", name="uq_raw_updates_source_url"),
@@ -54,15 +63,26 @@ class CleanUpdate(Base):
     cards = relationship("Card", back_populates="clean_update")
 
 
+class County(Base):
+    __tablename__ = "counties"
+
+    slug = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+
+
 class DuplicateGroup(Base):
     __tablename__ = "duplicate_groups"
 
     id = Column("id", String, primary_key=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     signature = Column(Text, nullable=True)
+    window_start = Column(DateTime(timezone=True), nullable=True)
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)
 
     cards = relationship("Card", back_populates="duplicate_group")
 
+    __table_args__ = (Index("ix_duplicate_groups_window", "signature", "window_start", "last_seen_at"),)
+
 
 mode_enum = Enum("action", "info", name="card_mode")
 category_enum = Enum(
@@ -74,7 +94,8 @@ category_enum = Enum(
     name="card_category",
 )
 urgency_enum = Enum("low", "medium", "high", name="card_urgency")
-county_enum = Enum("broward", "miami-dade", name="card_county")
+# Stored on each card as urgency_rank so the action feed's order is indexable.
+URGENCY_RANK = {"low": 1, "medium": 2, "high": 3}
 
 
 class Card(Base):
@@ -86,7 +107,8 @@ class Card(Base):
     category = Column(category_enum, nullable=False)
     action_type = Column(String, nullable=True)
     urgency = Column(urgency_enum, nullable=False)
-    county = Column(county_enum, nullable=False)
+    urgency_rank = Column(SmallInteger, nullable=False)
+    county = Column(String, ForeignKey("counties.slug"), nullable=False)
     city = Column(String, nullable=True)
     title = Column(Text, nullable=False)
     summary = Column(Text, nullable=False)
@@ -94,16 +116,138 @@ class Card(Base):
     source_url = Column(Text, nullable=False)
     published_at = Column(DateTime(timezone=True), nullable=False)
     duplicate_group_id = Column(String, ForeignKey("duplicate_groups.id", ondelete="SET NULL"), nullable=True)
+    rules_fingerprint = Column(String, nullable=True)
+    # Null for cards made before migration 0012.
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
 
     clean_update = relationship("CleanUpdate", back_populates="cards")
     duplicate_group = relationship("DuplicateGroup", back_populates="cards")
 
     __table_args__ = (
-        Index("ix_cards_mode", "mode"),
+        # Feed shapes of GET /cards: action pages by rank then recency,
+        # info pages by recency, either optionally narrowed to a county or
+        # a category (see backend.app.main.card_feed).
+        Index("ix_cards_feed", "mode", "urgency_rank", "published_at", "id"),
+        Index("ix_cards_feed_county", "mode", "county", "urgency_rank", "published_at", "id"),
+        Index("ix_cards_feed_category", "mode", "category", "urgency_rank", "published_at", "id"),
+        Index("ix_cards_feed_recent", "mode", "published_at", "id"),
+        Index("ix_cards_feed_recent_county", "mode", "county", "published_at", "id"),
+        Index("ix_cards_feed_recent_category", "mode", "category", "published_at", "id"),
         Index("ix_cards_category", "category"),
         Index("ix_cards_urgency", "urgency"),
         Index("ix_cards_county", "county"),
         Index("ix_cards_published_at", "published_at"),
         Index("ix_cards_duplicate_group_id", "duplicate_group_id"),
+        Index("ix_cards_rules_fingerprint", "rules_fingerprint"),
         CheckConstraint("mode in ('action','info')", name="ck_cards_mode_valid"),
     )
+
+
+class IngestWatermark(Base):
+    __tablename__ = "ingest_watermarks"
+
+    source = Column(String, primary_key=True)
+    last_published_at = Column(DateTime(timezone=True), nullable=True)
+    cursor = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class BackfillSlice(Base):
+    __tablename__ = "backfill_slices"
+
+    source = Column(String, primary_key=True)
+    slice_key = Column(String, primary_key=True)
+    row_count = Column(Integer, nullable=False, server_default="0")
+    completed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class CleanCache(Base):
+    __tablename__ = "clean_cache"
+
+    content_key = Column(String, primary_key=True)
+    cleaned_text = Column(Text, nullable=False)
+    cleaned_hash = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ClassificationCache(Base):
+    __tablename__ = "classification_cache"
+
+    cleaned_hash = Column(String, primary_key=True)
+    rules_fingerprint = Column(String, primary_key=True)
+    mode = Column(String, nullable=False)
+    category = Column(String, nullable=True)
+    urgency = Column(String, nullable=False)
+    action_type = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class RuleSet(Base):
+    __tablename__ = "rule_sets"
+
+    fingerprint = Column(String, primary_key=True)
+    rules = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class RulePatternHit(Base):
+    __tablename__ = "rule_pattern_hits"
+
+    pattern_key = Column(String, primary_key=True)
+    cleaned_hash = Column(String, primary_key=True)
+
+
+class MinHashSignature(Base):
+    __tablename__ = "minhash_signatures"
+
+    cleaned_hash = Column(String, primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+
+class PipelineRun(Base):
+    __tablename__ = "pipeline_runs"
+
+    id = Column(String, primary_key=True)
+    mode = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    wall_seconds = Column(Float, nullable=False)
+    report = Column(JSON, nullable=False)
+
+    __table_args__ = (Index("ix_pipeline_runs_started_at", "started_at"),)
+
+
+class WorkItem(Base):
+    __tablename__ = "work_queue"
+
+    stage = Column(String, primary_key=True)
+    item_id = Column(String, primary_key=True)
+    bucket = Column(Integer, Computed("hashtext(item_id) & 1023", persisted=True), nullable=False)
+    parked_under = Column(String, nullable=True)
+    priority = Column(SmallInteger, server_default="0", nullable=False)
+    enqueued_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_work_queue_claim",
+            "stage",
+            priority.desc(),
+            "enqueued_at",
+            postgresql_where=text("parked_under IS NULL"),
+        ),
+        Index("ix_work_queue_parked", "stage", "parked_under", postgresql_where=text("parked_under IS NOT NULL")),
+    )
+
+
+class CardRollup(Base):
+    # Cards per UTC hour of published_at and key, kept current by triggers
+    # on cards (migration 0014); /stats and /summary count from here.
+    __tablename__ = "card_rollups"
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    mode = Column(mode_enum, primary_key=True)
+    category = Column(category_enum, primary_key=True)
+    county = Column(String, primary_key=True)
+    urgency = Column(urgency_enum, primary_key=True)
+    cards = Column(Integer, nullable=False)
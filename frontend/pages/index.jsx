@@ -1,18 +1,18 @@
-﻿import { useEffect, useMemo, useState } from "react";
+﻿import { useEffect, useMemo, useRef, useState } from "react";
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || "http://localhost:8000";
 
-const counties = ["", "broward", "miami-dade"];
 const categories = ["", "shelter", "medical", "food-water", "utilities", "transportation"];
 const urgencies = ["", "high", "medium", "low"];
 
-function Filters({ county, category, urgency, onChange }) {
+function Filters({ counties, county, category, urgency, onChange }) {
   return (
     <div className="filters">
       <select value={county} onChange={(e) => onChange({ county: e.target.value })}>
+        <option value="">All counties</option>
         {counties.map((c) => (
-          <option key={c || "all"} value={c}>
-            {c ? c : "All counties"}
+          <option key={c.slug} value={c.slug}>
+            {c.name}
           </option>
         ))}
       </select>
@@ -64,8 +64,12 @@ export default function Home() {
   const [mode, setMode] = useState("action");
   const [filters, setFilters] = useState({ county: "", category: "", urgency: "" });
   const [cards, setCards] = useState([]);
+  const [counties, setCounties] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  // The query the list on screen belongs to, for requests that outlive it.
+  const shownQuery = useRef(null);
 
   const query = useMemo(() => {
     const params = new URLSearchParams({ mode });
@@ -76,16 +80,35 @@ export default function Home() {
     return params.toString();
   }, [mode, filters]);
 
+  useEffect(() => {
+    fetch(`${API_BASE}/counties`)
+      .then((res) => (res.ok ? res.json() : []))
+      .then(setCounties)
+      .catch(() => setCounties([]));
+  }, []);
+
+  // Each page carries the cursor for the next one in X-Next-Cursor; it is
+  // absent on the last page.
+  async function fetchPage(cursor) {
+    const url = cursor ? `${API_BASE}/cards?${query}&cursor=${encodeURIComponent(cursor)}` : `${API_BASE}/cards?${query}`;
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return { data: await res.json(), next: res.headers.get("X-Next-Cursor") };
+  }
+
   useEffect(() => {
     let cancelled = false;
+    shownQuery.current = query;
     async function load() {
       setLoading(true);
       setError("");
+      setNextCursor(null);
       try {
-        const res = await fetch(`${API_BASE}/cards?${query}`);
-        if (!res.ok) throw new Error(`HTTP ${res.status}`);
-        const data = await res.json();
-        if (!cancelled) setCards(data);
+        const page = await fetchPage(null);
+        if (!cancelled) {
+          setCards(page.data);
+          setNextCursor(page.next);
+        }
       } catch (err) {
         if (!cancelled) setError(err.message || "Failed to load");
       } finally {
@@ -98,6 +121,26 @@ export default function Home() {
     };
   }, [query]);
 
+  const loadMore = async () => {
+    // A page that arrives after the mode or filters changed belongs to the
+    // old list; drop it rather than append it to the new one.
+    const requested = query;
+    const stale = () => shownQuery.current !== requested;
+    setLoading(true);
+    setError("");
+    try {
+      const page = await fetchPage(nextCursor);
+      if (!stale()) {
+        setCards((prev) => [...prev, ...page.data]);
+        setNextCursor(page.next);
+      }
+    } catch (err) {
+      if (!stale()) setError(err.message || "Failed to load");
+    } finally {
+      if (!stale()) setLoading(false);
+    }
+  };
+
   const onFilterChange = (partial) => setFilters((prev) => ({ ...prev, ...partial }));
 
   return (
@@ -120,7 +163,7 @@ export default function Home() {
         </div>
       </div>
 
-      <Filters county={filters.county} category={filters.category} urgency={filters.urgency} onChange={onFilterChange} />
+      <Filters counties={counties} county={filters.county} category={filters.category} urgency={filters.urgency} onChange={onFilterChange} />
 
       {loading && <div>Loading...</div>}
       {error && <div style={{ color: "salmon" }}>Error: {error}</div>}
@@ -131,6 +174,12 @@ export default function Home() {
         ))}
       </div>
 
+      {!loading && nextCursor && (
+        <button className="tab more" onClick={loadMore}>
+          Load more
+        </button>
+      )}
+
       {!loading && cards.length === 0 && <div>No cards found for this mode/filters.</div>}
     </div>
   );
@@ -0,0 +1,219 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import requests
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.app.db import SessionLocal  # noqa: E402
+from backend.app import models  # noqa: E402
+from pipeline.ingest import nws  # noqa: E402
+from pipeline.ingest.http import build_session  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+COPY_COLUMNS = (
+    "id",
+    "source",
+    "source_url",
+    "source_item_id",
+    "published_at",
+    "raw_text",
+    "raw_html",
+    "content_hash",
+    "priority",
+)
+DEFAULT_SLICE_HOURS = 24
+DEFAULT_WORKERS = 8
+
+
+class Slice(NamedTuple):
+    key: str
+    start: Optional[datetime]
+    end: Optional[datetime]
+    path: Optional[str] = None
+
+
+def parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def plan_slices(
+    start: Optional[datetime], end: Optional[datetime], size: timedelta, from_dir: Optional[str] = None
+) -> List[Slice]:
+    if from_dir:
+        # Dumps are loaded whole unless a window is given; either bound may
+        # be left open.
+        paths = sorted(glob.glob(os.path.join(from_dir, "*.json")) + glob.glob(os.path.join(from_dir, "*.jsonl")))
+        return [Slice(f"file:{os.path.basename(path)}", start, end, path) for path in paths]
+    start = start or nws.DATE_START
+    end = end or nws.DATE_END
+    return [Slice(f"{s.isoformat()}/{e.isoformat()}", s, e) for s, e in nws.time_slices(start, end, size)]
+
+
+def read_features(path: str) -> Iterator[Dict[str, Any]]:
+    # Accepts either a saved /alerts response (a FeatureCollection) or one
+    # feature per line.
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith(".jsonl"):
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(fh).get("features", [])
+
+
+def slice_rows(work: Slice, http: Optional[requests.Session]) -> List[Dict[str, Any]]:
+    if work.path:
+        features: Any = read_features(work.path)
+    else:
+        features = nws.fetch_slice(http, work.start, work.end) or []
+
+    rows = []
+    for feature in features:
+        if not nws.within_scope(feature, work.start, work.end):
+            continue
+        row = nws.feature_to_row(feature)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def copy_merge(session: Session, rows: Sequence[Dict[str, Any]]) -> int:
+    # COPY into an unindexed temp table, then one set-based merge. DISTINCT ON
+    # drops repeats inside the slice; ON CONFLICT drops rows already stored.
+    columns = ", ".join(COPY_COLUMNS)
+    conn = session.connection()
+    conn.exec_driver_sql(
+        "CREATE TEMP TABLE raw_updates_staging (LIKE raw_updates INCLUDING DEFAULTS) ON COMMIT DROP"
+    )
+    with conn.connection.driver_connection.cursor() as cursor:
+        with cursor.copy(f"COPY raw_updates_staging ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row[column] for column in COPY_COLUMNS])
+
+    result = conn.exec_driver_sql(
+        f"INSERT INTO raw_updates ({columns}) "
+        f"SELECT DISTINCT ON (source, source_item_id) {columns} FROM raw_updates_staging "
+        "ORDER BY source, source_item_id "
+        "ON CONFLICT DO NOTHING"
+    )
+    return result.rowcount
+
+
+def load_slice(work: Slice, http: Optional[requests.Session]) -> int:
+    rows = slice_rows(work, http)
+    session = SessionLocal()
+    try:
+        inserted = copy_merge(session, rows) if rows else 0
+        # Marking the slice done shares the merge transaction, so a crash
+        # either leaves both or neither.
+        session.execute(
+            pg_insert(models.BackfillSlice.__table__)
+            .values(source=nws.SOURCE_NAME, slice_key=work.key, row_count=inserted)
+            .on_conflict_do_nothing()
+        )
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return inserted
+
+
+def completed_slices() -> set:
+    session = SessionLocal()
+    try:
+        stmt = select(models.BackfillSlice.slice_key).where(models.BackfillSlice.source == nws.SOURCE_NAME)
+        return set(session.execute(stmt).scalars().all())
+    finally:
+        session.close()
+
+
+def backfill(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    slice_size: timedelta = timedelta(hours=DEFAULT_SLICE_HOURS),
+    workers: int = DEFAULT_WORKERS,
+    from_dir: Optional[str] = None,
+) -> int:
+    done = completed_slices()
+    pending = [work for work in plan_slices(start, end, slice_size, from_dir) if work.key not in done]
+    logger.info("Backfill: %d slices pending, %d already complete", len(pending), len(done))
+    if not pending:
+        return 0
+
+    workers = max(1, min(workers, len(pending)))
+    http = None if from_dir else build_session(pool_size=workers)
+    started = time.perf_counter()
+    total = 0
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill") as pool:
+            futures = {pool.submit(load_slice, work, http): work for work in pending}
+            for future in as_completed(futures):
+                work = futures[future]
+                try:
+                    inserted = future.result()
+                except Exception as exc:
+                    failed += 1
+                    logger.error("Slice %s failed: %s", work.key, exc)
+                    continue
+                total += inserted
+                logger.info("Slice %s loaded rows=%d", work.key, inserted)
+    finally:
+        if http:
+            http.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Backfill done. slices=%d failed=%d rows=%d elapsed=%.1fs rate=%.0f rows/s",
+        len(pending) - failed,
+        failed,
+        total,
+        elapsed,
+        total / elapsed if elapsed else 0.0,
+    )
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-load historical NWS alerts into raw_updates.")
+    parser.add_argument(
+        "--start", help="ISO timestamp, inclusive (default: the demo window's start, or unbounded with --from-dir)"
+    )
+    parser.add_argument(
+        "--end", help="ISO timestamp, inclusive (default: the demo window's end, or unbounded with --from-dir)"
+    )
+    parser.add_argument("--slice-hours", type=float, default=DEFAULT_SLICE_HOURS)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--from-dir", help="Load saved alert dumps (*.json, *.jsonl) instead of calling the API")
+    args = parser.parse_args(argv)
+
+    backfill(
+        parse_ts(args.start) if args.start else None,
+        parse_ts(args.end) if args.end else None,
+        slice_size=timedelta(hours=args.slice_hours),
+        workers=args.workers,
+        from_dir=args.from_dir,
+    )
+
+
+if __name__ == "__main__":
+    main()
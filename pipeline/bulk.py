@@ -0,0 +1,97 @@
+from datetime import datetime
+from hashlib import sha256
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from pipeline import priority
+
+BATCH_SIZE = 1000
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_ignore(
+    session: Session,
+    model: Any,
+    rows: Sequence[Dict[str, Any]],
+    batch_size: int = BATCH_SIZE,
+    key_column: str = "id",
+) -> List[Any]:
+    # INSERT ... ON CONFLICT DO NOTHING, executed per batch as an
+    # executemany that SQLAlchemy folds into multi-row VALUES. Passing the
+    # rows as parameters keeps one cached compiled statement; building
+    # .values(batch) instead recompiles a bind per cell on every call. Rows
+    # hitting any unique constraint are skipped, matching the old per-row
+    # IntegrityError handling; RETURNING reports which keys actually landed.
+    table = model.__table__
+    stmt = pg_insert(table).on_conflict_do_nothing().returning(table.c[key_column])
+    inserted: List[Any] = []
+    for batch in chunked(rows, batch_size):
+        inserted.extend(session.execute(stmt, batch).scalars().all())
+    return inserted
+
+
+def update_rows(
+    session: Session, model: Any, rows: Sequence[Dict[str, Any]], batch_size: int = BATCH_SIZE
+) -> int:
+    # UPDATE by primary key, one executemany per batch; every row carries the
+    # key plus the columns to set.
+    for batch in chunked(rows, batch_size):
+        session.execute(update(model), batch)
+    return len(rows)
+
+
+def raw_update_row(
+    source: str,
+    item_id: str,
+    source_url: str,
+    published_at: datetime,
+    raw_text: str,
+    raw_html: Optional[str] = None,
+) -> Dict[str, Any]:
+    return {
+        "id": item_id,
+        "source": source,
+        "source_url": source_url,
+        "source_item_id": item_id,
+        "published_at": published_at,
+        "raw_text": raw_text,
+        "raw_html": raw_html,
+        "content_hash": sha256(raw_text.encode("utf-8")).hexdigest(),
+        "priority": priority.prescore(raw_text, source),
+    }
+
+
+def land_raw_updates(
+    session: Session, rows: Sequence[Dict[str, Any]], batch_size: int = BATCH_SIZE
+) -> Tuple[List[Dict[str, Any]], int]:
+    # Collapse repeats of (source, source_item_id) inside the batch first so
+    # the skipped count reflects both in-batch and already-stored duplicates.
+    # Returns the rows that were actually inserted.
+    unique: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in rows:
+        unique.setdefault((row["source"], row["source_item_id"]), row)
+
+    inserted = set(insert_ignore(session, models.RawUpdate, list(unique.values()), batch_size))
+    landed = [row for row in unique.values() if row["id"] in inserted]
+    return landed, len(rows) - len(landed)
+
+
+def insert_raw_updates(
+    session: Session, rows: Sequence[Dict[str, Any]], batch_size: int = BATCH_SIZE
+) -> Tuple[int, int]:
+    landed, skipped = land_raw_updates(session, rows, batch_size)
+    return len(landed), skipped
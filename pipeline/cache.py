@@ -0,0 +1,102 @@
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from pipeline import bulk
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "50000"))
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class ResultCache:
+    # Read-through cache: an in-process LRU in front of a table keyed by a
+    # content hash. `scope` pins extra key columns (e.g. the rules
+    # fingerprint) so entries written under other versions never match.
+    def __init__(
+        self,
+        model: Any,
+        key_column: str,
+        value_columns: Sequence[str],
+        scope: Optional[Dict[str, Any]] = None,
+        maxsize: int = RESULT_CACHE_SIZE,
+    ) -> None:
+        self.model = model
+        self.key_column = key_column
+        self.value_columns = tuple(value_columns)
+        self.scope = scope or {}
+        self.lru = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, session: Session, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for key in set(keys):
+            value = self.lru.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+
+        table = self.model.__table__
+        for batch in bulk.chunked(missing, bulk.BATCH_SIZE):
+            columns = [table.c[self.key_column]] + [table.c[name] for name in self.value_columns]
+            stmt = select(*columns).where(table.c[self.key_column].in_(batch))
+            for name, value in self.scope.items():
+                stmt = stmt.where(table.c[name] == value)
+            for row in session.execute(stmt):
+                value = dict(zip(self.value_columns, row[1:]))
+                found[row[0]] = value
+                self.lru.put(row[0], value)
+
+        self.hits += len(found)
+        self.misses += sum(1 for key in missing if key not in found)
+        return found
+
+    def put_many(self, session: Session, values: Dict[str, Dict[str, Any]]) -> None:
+        # Key order, so concurrent workers writing overlapping entries take
+        # the unique-index locks in the same order instead of deadlocking.
+        rows = []
+        for key in sorted(values):
+            value = values[key]
+            self.lru.put(key, value)
+            rows.append({self.key_column: key, **self.scope, **value})
+        if rows:
+            bulk.insert_ignore(session, self.model, rows, key_column=self.key_column)
+
+
+def clean_cache() -> ResultCache:
+    return ResultCache(models.CleanCache, "content_key", ("cleaned_text", "cleaned_hash"))
+
+
+def classification_cache(rules_fingerprint: str) -> ResultCache:
+    return ResultCache(
+        models.ClassificationCache,
+        "cleaned_hash",
+        ("mode", "category", "urgency", "action_type"),
+        scope={"rules_fingerprint": rules_fingerprint},
+    )
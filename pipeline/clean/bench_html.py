@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+from functools import partial
+from typing import Callable, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from pipeline import synthetic  # noqa: E402
+from pipeline.clean import html_text  # noqa: E402
+from pipeline.clean.clean_text import normalize_whitespace  # noqa: E402
+
+
+def corpus(count: int, html_ratio: float, seed: int) -> List[str]:
+    # Documents as the clean stage sees them: raw_html when present, else the
+    # plain raw_text (which exercises the no-markup fast path).
+    rows = synthetic.generate(count, seed=seed, duplicate_rate=0.0, html_ratio=html_ratio)
+    return [row["raw_html"] or row["raw_text"] for row in rows]
+
+
+def run(name: str, extract: Callable[[str], str], docs: List[str], reference: List[str], rounds: int) -> None:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        outputs = [extract(doc) for doc in docs]
+        best = min(best, time.perf_counter() - started)
+    mismatches = sum(1 for got, want in zip(outputs, reference) if normalize_whitespace(got) != want)
+    print(f"{name:<14} {len(docs) / best:>12,.0f} docs/s   mismatches={mismatches}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Throughput of the HTML-to-text engines.")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--html-ratio", type=float, default=0.5)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    docs = corpus(args.count, args.html_ratio, args.seed)
+    reference = [normalize_whitespace(html_text.bs4_text(doc)) for doc in docs]
+    print(f"{len(docs)} documents, html_ratio={args.html_ratio}, best of {args.rounds}")
+
+    for name, engine in html_text.ENGINES.items():
+        run(name, engine, docs, reference, args.rounds)
+        if name != "bs4":
+            fast = partial(html_text.html_to_text, engine=name)
+            run(f"{name}+fast", fast, docs, reference, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
+import argparse
 import logging
 import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from hashlib import sha256
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
-from bs4 import BeautifulSoup
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT_DIR not in sys.path:
@@ -14,14 +16,23 @@ if ROOT_DIR not in sys.path:
 
 from backend.app.db import SessionLocal  # noqa: E402
 from backend.app import models  # noqa: E402
+from pipeline import bulk, workqueue  # noqa: E402
+from pipeline.cache import ResultCache, clean_cache  # noqa: E402
+from pipeline.clean import html_text  # noqa: E402
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = int(os.getenv("CLEAN_CHUNK_SIZE", "2000"))
+CLEAN_WORKERS = int(os.getenv("CLEAN_WORKERS", str(os.cpu_count() or 1)))
+# Below this many rows a chunk is cleaned in-process; forking is not worth it.
+MIN_PARALLEL_ROWS = 200
+
 
 def strip_html(text: str) -> str:
-    soup = BeautifulSoup(text, "html.parser")
-    return soup.get_text(separator=" ")
+    # Engine is chosen by CLEAN_HTML_ENGINE; every engine matches
+    # BeautifulSoup's get_text(separator=" ") once whitespace is normalized.
+    return html_text.html_to_text(text)
 
 
 def normalize_whitespace(text: str) -> str:
@@ -37,48 +48,137 @@ def clean_raw_text(raw_text: str, raw_html: Optional[str]) -> str:
     return text
 
 
-def ingest_clean() -> None:
+def clean_cache_key(content_hash: str, raw_html: Optional[str]) -> str:
+    # content_hash only covers raw_text, and cleaning prefers raw_html.
+    if not raw_html:
+        return content_hash
+    html_hash = sha256(raw_html.encode("utf-8")).hexdigest()
+    return sha256(f"{content_hash}|{html_hash}".encode("utf-8")).hexdigest()
+
+
+def clean_row(row: Sequence[Any]) -> Dict[str, Any]:
+    raw_id, raw_text, raw_html = row[:3]
+    cleaned_text = clean_raw_text(raw_text, raw_html)
+    return {
+        "id": raw_id,
+        "raw_update_id": raw_id,
+        "cleaned_text": cleaned_text,
+        "cleaned_hash": sha256(cleaned_text.encode("utf-8")).hexdigest(),
+    }
+
+
+def clean_rows(
+    rows: Sequence[Sequence[Any]],
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    if pool is None or len(rows) < MIN_PARALLEL_ROWS:
+        return [clean_row(row) for row in rows]
+    return list(pool.map(clean_row, rows, chunksize=max(1, len(rows) // (workers * 4))))
+
+
+def clean_chunk(
+    session: Session,
+    rows: Sequence[Tuple[str, str, Optional[str], str]],
+    cache: ResultCache,
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    # Rows are (id, raw_text, raw_html, content_hash). Identical content is
+    # cleaned once: cached results are reused and repeats inside the chunk
+    # share one computation.
+    keys = {row[0]: clean_cache_key(row[3], row[2]) for row in rows}
+    results = cache.get_many(session, keys.values())
+
+    todo: Dict[str, Sequence[Any]] = {}
+    for row in rows:
+        key = keys[row[0]]
+        if key not in results and key not in todo:
+            todo[key] = row
+
+    fresh = {}
+    for key, record in zip(todo, clean_rows(list(todo.values()), pool, workers)):
+        fresh[key] = {"cleaned_text": record["cleaned_text"], "cleaned_hash": record["cleaned_hash"]}
+    cache.put_many(session, fresh)
+    results.update(fresh)
+
+    return [{"id": raw_id, "raw_update_id": raw_id, **results[key]} for raw_id, key in keys.items()]
+
+
+def write_clean_batch(session: Session, records: Sequence[Dict[str, Any]]) -> int:
+    return len(bulk.insert_ignore(session, models.CleanUpdate, records))
+
+
+def pending_raw_updates():
+    # Raw updates queued for cleaning; see workqueue.claim.
+    return select(
+        models.RawUpdate.id,
+        models.RawUpdate.raw_text,
+        models.RawUpdate.raw_html,
+        models.RawUpdate.content_hash,
+    ).join(models.WorkItem, models.WorkItem.item_id == models.RawUpdate.id)
+
+
+def ingest_clean(
+    workers: int = CLEAN_WORKERS,
+    chunk_size: int = CHUNK_SIZE,
+    shard: Optional[int] = None,
+    shards: int = 1,
+) -> int:
+    # Each chunk is claimed from the work queue, cleaned and written in one
+    # transaction, so any number of these can run side by side -- in other
+    # processes or on other hosts -- without cleaning a row twice. Memory
+    # stays bounded by the chunk size however large the backlog is.
     session = SessionLocal()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    cache = clean_cache()
+    buckets = workqueue.shard_buckets(shard, shards)
+    failed: Set[str] = set()
     processed = 0
     inserted = 0
     skipped = 0
 
-    raw_without_clean = (
-        session.query(models.RawUpdate)
-        .outerjoin(models.CleanUpdate, models.CleanUpdate.raw_update_id == models.RawUpdate.id)
-        .filter(models.CleanUpdate.id.is_(None))
-        .all()
+    try:
+        while True:
+            claim = workqueue.claim(pending_raw_updates(), "clean", chunk_size, buckets, failed)
+            rows = [tuple(row) for row in session.execute(claim)]
+            if not rows:
+                session.rollback()
+                break
+            processed += len(rows)
+            try:
+                records = clean_chunk(session, rows, cache, pool, workers)
+                chunk_inserted = write_clean_batch(session, records)
+                workqueue.complete(session, "clean", [row[0] for row in rows])
+                session.commit()
+            except Exception as exc:  # pragma: no cover
+                # The claim is released; the next run retries these rows.
+                session.rollback()
+                failed.update(row[0] for row in rows)
+                logger.error("Failed to insert clean_updates chunk of %d rows: %s", len(rows), exc)
+                continue
+            inserted += chunk_inserted
+            skipped += len(records) - chunk_inserted
+            logger.info("Cleaned %d raw updates so far (inserted=%d)", processed, inserted)
+    finally:
+        if pool:
+            pool.shutdown()
+        session.close()
+
+    logger.info(
+        "Done. Processed=%d inserted=%d skipped=%d cache_hits=%d", processed, inserted, skipped, cache.hits
     )
+    return inserted
+
 
-    logger.info("Found %d raw updates without clean records", len(raw_without_clean))
-
-    for raw in raw_without_clean:
-        processed += 1
-        cleaned_text = clean_raw_text(raw.raw_text, raw.raw_html)
-        cleaned_hash = sha256(cleaned_text.encode("utf-8")).hexdigest()
-
-        clean_record = models.CleanUpdate(
-            id=raw.id,
-            raw_update_id=raw.id,
-            cleaned_text=cleaned_text,
-            cleaned_hash=cleaned_hash,
-        )
-        session.add(clean_record)
-        try:
-            session.commit()
-            inserted += 1
-            logger.info("Inserted clean_update for raw_update_id=%s", raw.id)
-        except IntegrityError:
-            session.rollback()
-            skipped += 1
-            logger.info("Skip duplicate clean_update for raw_update_id=%s", raw.id)
-        except Exception as exc:  # pragma: no cover
-            session.rollback()
-            logger.error("Failed to insert clean_update for raw_update_id=%s: %s", raw.id, exc)
-
-    logger.info("Done. Processed=%d inserted=%d skipped=%d", processed, inserted, skipped)
-    session.close()
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Clean queued raw updates.")
+    parser.add_argument("--workers", type=int, default=CLEAN_WORKERS, help="processes cleaning each chunk")
+    parser.add_argument("--shard", type=int, default=None, help="only take this shard of the queue (0-based)")
+    parser.add_argument("--shards", type=int, default=1, help="number of shards the queue is split into")
+    args = parser.parse_args(argv)
+    ingest_clean(args.workers, shard=args.shard, shards=args.shards)
 
 
 if __name__ == "__main__":
-    ingest_clean()
+    main()
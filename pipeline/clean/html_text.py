@@ -0,0 +1,210 @@
+import os
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
+
+try:  # optional backend
+    from lxml import etree
+except ImportError:  # pragma: no cover
+    etree = None
+
+# Output contract for every engine: once whitespace is normalized, the text
+# must equal BeautifulSoup(markup, "html.parser").get_text(separator=" ").
+# That means one separator at every tag, comment, declaration or processing
+# instruction boundary, and no text from the tags BeautifulSoup files under
+# special string classes (script, style, template, rt, rp).
+HIDDEN_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+EMPTY_ELEMENT_TAGS = frozenset(HTMLTreeBuilder.empty_element_tags)
+
+CLEAN_HTML_ENGINE = os.getenv("CLEAN_HTML_ENGINE", "auto")
+
+
+def has_markup(text: str) -> bool:
+    return "<" in text or "&" in text
+
+
+def bs4_text(markup: str) -> str:
+    return BeautifulSoup(markup, "html.parser").get_text(separator=" ")
+
+
+class _TextTokenizer(HTMLParser):
+    # Replays BeautifulSoup's html.parser tree builder on a bare stack of tag
+    # names: the same string boundaries and the same hidden strings, without
+    # building Tag or NavigableString objects.
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.parts: List[str] = []
+        self._buffer: List[str] = []
+        self._stack: List[str] = []
+        self._hidden = 0
+        self._already_closed: List[str] = []
+
+    def _flush(self) -> None:
+        if self._buffer:
+            if not self._hidden:
+                self.parts.append("".join(self._buffer))
+            self._buffer = []
+
+    def _pop_to(self, name: str) -> None:
+        if name not in self._stack:
+            return
+        while self._stack:
+            popped = self._stack.pop()
+            if popped in HIDDEN_TAGS:
+                self._hidden -= 1
+            if popped == name:
+                break
+
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        self._flush()
+        self._stack.append(tag)
+        if tag in HIDDEN_TAGS:
+            self._hidden += 1
+        if handle_empty_element and tag in EMPTY_ELEMENT_TAGS:
+            self.handle_endtag(tag, check_already_closed=False)
+            self._already_closed.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self._already_closed:
+            # A redundant close of a void element: BeautifulSoup ignores it
+            # without ending the current string.
+            self._already_closed.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self._buffer.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith(("x", "X")):
+            codepoint = int(name.lstrip("xX"), 16)
+        else:
+            codepoint = int(name)
+
+        data = None
+        if codepoint < 256:
+            # Same Windows-1252 fallback BeautifulSoup applies to &#147; etc.
+            try:
+                data = bytearray([codepoint]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codepoint)
+            except (ValueError, OverflowError):
+                pass
+        self._buffer.append(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self._buffer.append(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            # CData keeps its own string class, so it shows up even inside
+            # hidden tags.
+            self.parts.append(data[len("CDATA[") :])
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def stdlib_text(markup: str) -> str:
+    tokenizer = _TextTokenizer()
+    try:
+        tokenizer.feed(markup)
+        tokenizer.close()
+    except Exception:
+        # Whatever html.parser rejects, BeautifulSoup decides the outcome.
+        return bs4_text(markup)
+    return " ".join(tokenizer.parts)
+
+
+class _LxmlTarget:
+    def __init__(self) -> None:
+        self.parts: List[str] = []
+        self._buffer: List[str] = []
+        self._hidden = 0
+
+    def _flush(self) -> None:
+        if self._buffer:
+            if not self._hidden:
+                self.parts.append("".join(self._buffer))
+            self._buffer = []
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag in HIDDEN_TAGS:
+            self._hidden += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag in HIDDEN_TAGS:
+            self._hidden -= 1
+
+    def data(self, data):
+        self._buffer.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def pi(self, target, data=None):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        return self.parts
+
+
+def lxml_text(markup: str) -> str:
+    # libxml2 repairs broken markup and resolves unknown entities on its own
+    # terms, so this backend is only as close to bs4 as the input is clean.
+    # It is opt-in; "auto" never selects it.
+    if etree is None:
+        raise RuntimeError("lxml is not installed")
+    parser = etree.HTMLParser(target=_LxmlTarget())
+    parser.feed(markup)
+    return " ".join(parser.close())
+
+
+ENGINES: Dict[str, Callable[[str], str]] = {
+    "bs4": bs4_text,
+    "stdlib": stdlib_text,
+}
+if etree is not None:
+    ENGINES["lxml"] = lxml_text
+
+
+def get_engine(name: Optional[str] = None) -> Callable[[str], str]:
+    name = name or CLEAN_HTML_ENGINE
+    if name == "auto":
+        name = "stdlib"
+    if name not in ENGINES:
+        raise ValueError(f"Unknown or unavailable HTML engine: {name}")
+    return ENGINES[name]
+
+
+def html_to_text(markup: str, engine: Optional[str] = None) -> str:
+    if not has_markup(markup):
+        # Nothing to parse: html.parser would hand the string back unchanged.
+        return markup
+    return get_engine(engine)(markup)
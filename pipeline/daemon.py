@@ -0,0 +1,162 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import psycopg
+from sqlalchemy.exc import DBAPIError
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.app.db import engine  # noqa: E402
+from pipeline import run_all  # noqa: E402
+from pipeline.clean import clean_text  # noqa: E402
+from pipeline.dedup import dedup  # noqa: E402
+from pipeline.extract import extract_cards, reextract  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+# Without a notification for this long every stage runs anyway, in case one
+# was missed; 0 leaves the daemon fully idle between notifications.
+DAEMON_POLL_SECONDS = float(os.getenv("DAEMON_POLL_SECONDS", "300"))
+# How often the registered sources are fetched; 0 leaves ingest to others
+# (backfill, a cron'd run_all) and only processes what they land.
+DAEMON_INGEST_SECONDS = float(os.getenv("DAEMON_INGEST_SECONDS", "60"))
+# After a wake-up, notifications arriving within this long are folded in.
+DEBOUNCE_SECONDS = 0.2
+RECONNECT_SECONDS = 5.0
+
+# Stages in pipeline order, with the channel that signals work for each
+# (see migration 0009).
+STAGES: List[Tuple[str, str, Callable[[], object]]] = [
+    ("clean", "pipeline_raw_updates", clean_text.ingest_clean),
+    ("extract", "pipeline_clean_updates", extract_cards.extract),
+    ("dedup", "pipeline_cards", dedup.deduplicate),
+]
+
+
+class Listener:
+    # One autocommit connection LISTENing on the stage channels. Waiting on
+    # it blocks in the socket, so an idle daemon costs nothing.
+    def __init__(self, channels: List[str]) -> None:
+        self.channels = channels
+        self.conn = None
+        self.connect()
+
+    def connect(self) -> None:
+        self.conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        for channel in self.channels:
+            self.conn.exec_driver_sql(f"LISTEN {channel}")
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        # Channels notified within timeout (empty if none). None means the
+        # connection dropped and was re-established: anything could have
+        # been missed.
+        try:
+            raw = self.conn.connection.dbapi_connection
+            channels = {notify.channel for notify in raw.notifies(timeout=timeout, stop_after=1)}
+            if channels:
+                channels.update(notify.channel for notify in raw.notifies(timeout=DEBOUNCE_SECONDS))
+            return channels
+        except psycopg.OperationalError as exc:
+            logger.warning("Lost the LISTEN connection (%s); reconnecting", exc)
+
+        self.conn.invalidate()
+        self.close()
+        while True:
+            time.sleep(RECONNECT_SECONDS)
+            try:
+                self.connect()
+                return None
+            except DBAPIError as exc:
+                logger.warning("Reconnect failed: %s", exc)
+
+
+def run_stage(name: str, stage: Callable[[], object]) -> None:
+    started = time.monotonic()
+    try:
+        stage()
+    except Exception as exc:  # pragma: no cover
+        logger.error("Stage %s failed: %s", name, exc)
+        return
+    logger.info("Stage %s finished in %.2fs", name, time.monotonic() - started)
+
+
+def run(poll_seconds: float = DAEMON_POLL_SECONDS, ingest_seconds: float = DAEMON_INGEST_SECONDS) -> None:
+    by_channel: Dict[str, str] = {channel: name for name, channel, _ in STAGES}
+    listener = Listener(list(by_channel))
+    # SIGTERM stops the daemon the way Ctrl-C does, between or inside waits.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    reextract.reextract()
+    # Catch up on whatever landed while no daemon was listening.
+    pending: Set[str] = {name for name, _, _ in STAGES}
+    next_ingest = time.monotonic() if ingest_seconds else float("inf")
+    ingest: Optional[threading.Thread] = None
+    last_work = time.monotonic()
+    logger.info("Daemon listening on %s", ", ".join(by_channel))
+
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= next_ingest:
+                # Off the loop, so a slow source never holds up the stages
+                # its own inserts (or anyone else's) have signalled.
+                if ingest is not None and ingest.is_alive():
+                    logger.info("Previous ingest still running; skipping this one")
+                else:
+                    ingest = threading.Thread(
+                        target=run_stage, args=("ingest", run_all.ingest_all), name="ingest", daemon=True
+                    )
+                    ingest.start()
+                next_ingest = now + ingest_seconds
+
+            # A stage's own inserts notify the next one, so a burst flows down
+            # the pipeline over successive wake-ups.
+            for name, _, stage in STAGES:
+                if name in pending:
+                    pending.discard(name)
+                    run_stage(name, stage)
+                    last_work = time.monotonic()
+
+            now = time.monotonic()
+            deadlines = [next_ingest]
+            if poll_seconds:
+                deadlines.append(last_work + poll_seconds)
+            timeout = max(0.0, min(deadlines) - now)
+            channels = listener.wait(None if timeout == float("inf") else timeout)
+            if channels is None:
+                pending.update(name for name, _, _ in STAGES)
+            elif channels:
+                pending.update(by_channel[channel] for channel in channels if channel in by_channel)
+            elif poll_seconds and time.monotonic() >= last_work + poll_seconds:
+                logger.info("No notifications for %.0fs; polling every stage", poll_seconds)
+                pending.update(name for name, _, _ in STAGES)
+    except KeyboardInterrupt:
+        logger.info("Daemon stopping")
+    finally:
+        listener.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the pipeline continuously, driven by Postgres notifications.")
+    parser.add_argument("--poll-seconds", type=float, default=DAEMON_POLL_SECONDS)
+    parser.add_argument("--ingest-seconds", type=float, default=DAEMON_INGEST_SECONDS)
+    args = parser.parse_args(argv)
+    run(args.poll_seconds, args.ingest_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 import logging
 import os
 import sys
+from bisect import bisect_right
 from collections import defaultdict
-from datetime import timedelta
+from datetime import datetime, timedelta
 from hashlib import sha256
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import DateTime, Text, and_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT_DIR not in sys.path:
@@ -14,11 +17,34 @@ if ROOT_DIR not in sys.path:
 
 from backend.app.db import SessionLocal  # noqa: E402
 from backend.app import models  # noqa: E402
+from pipeline import bulk  # noqa: E402
+from pipeline.dedup import minhash  # noqa: E402
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
 WINDOW = timedelta(hours=6)
+CHUNK_SIZE = int(os.getenv("DEDUP_CHUNK_SIZE", "5000"))
+# "near" also merges reworded re-posts: a card whose cleaned text is within
+# DEDUP_JACCARD of an earlier card with the same category, county and
+# action type joins that card's group.
+DEDUP_MODE = os.getenv("DEDUP_MODE", "exact")
+DEDUP_JACCARD = float(os.getenv("DEDUP_JACCARD", "0.8"))
+# Advisory lock held by whoever is grouping cards (see lock()). Windows are
+# resolved against what earlier chunks wrote, so two groupers over the same
+# pending cards would open duplicate windows.
+DEDUP_LOCK = 0x64656475
+
+
+def lock(session: Session, wait: bool = True) -> bool:
+    # Takes DEDUP_LOCK until the session's transaction ends. Without wait,
+    # returns False instead of blocking when another grouper holds it. Read
+    # the pending cards only once the lock is held: a grouper that waited
+    # must not regroup cards the holder just grouped.
+    if wait:
+        session.execute(select(func.pg_advisory_xact_lock(DEDUP_LOCK)))
+        return True
+    return bool(session.execute(select(func.pg_try_advisory_xact_lock(DEDUP_LOCK))).scalar())
 
 
 def normalize(text: str) -> str:
@@ -32,61 +58,289 @@ def signature(card: models.Card) -> str:
     return "|".join(parts)
 
 
-def deduplicate() -> None:
-    session = SessionLocal()
-    inserted_groups = 0
-    grouped_cards = 0
+def group_id(sig: str, card_id: str) -> str:
+    return sha256(f"{sig}|{card_id}".encode("utf-8")).hexdigest()
+
+
+def pending_cards(near: bool = False):
+    # Only the columns the signature needs, oldest first so windows open at
+    # their earliest card.
+    stmt = select(
+        models.Card.id,
+        models.Card.title,
+        models.Card.category,
+        models.Card.county,
+        models.Card.action_type,
+        models.Card.published_at,
+    )
+    if near:
+        stmt = stmt.add_columns(models.CleanUpdate.cleaned_hash, models.CleanUpdate.cleaned_text).join(
+            models.CleanUpdate, models.CleanUpdate.id == models.Card.clean_update_id
+        )
+    return stmt.where(models.Card.duplicate_group_id.is_(None)).order_by(models.Card.published_at, models.Card.id)
+
+
+def window_lookup():
+    # Candidate windows per signature: those opening within [lo, hi]. The
+    # bounds go in as arrays unnested server-side, so the statement compiles
+    # once however many signatures a batch carries.
+    wanted = func.unnest(
+        bindparam("signatures", type_=ARRAY(Text)),
+        bindparam("los", type_=ARRAY(DateTime(timezone=True))),
+        bindparam("his", type_=ARRAY(DateTime(timezone=True))),
+    ).table_valued("signature", "lo", "hi").render_derived()
+    return (
+        select(
+            models.DuplicateGroup.id,
+            models.DuplicateGroup.signature,
+            models.DuplicateGroup.window_start,
+            models.DuplicateGroup.last_seen_at,
+        )
+        .join(
+            wanted,
+            and_(
+                models.DuplicateGroup.signature == wanted.c.signature,
+                models.DuplicateGroup.window_start >= wanted.c.lo,
+                models.DuplicateGroup.window_start <= wanted.c.hi,
+            ),
+        )
+        .order_by(models.DuplicateGroup.signature, models.DuplicateGroup.window_start)
+    )
+
+
+def open_windows(
+    session: Session, bounds: Dict[str, Tuple[datetime, datetime]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    # Existing windows that could take any of the chunk's cards: per
+    # signature, those opening within WINDOW before its earliest card up to
+    # its latest one -- one range scan on ix_duplicate_groups_window each.
+    found: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    stmt = window_lookup()
+    for batch in bulk.chunked(sorted(bounds.items()), bulk.BATCH_SIZE):
+        params = {
+            "signatures": [sig for sig, _ in batch],
+            "los": [lo for _, (lo, _) in batch],
+            "his": [hi for _, (_, hi) in batch],
+        }
+        for gid, sig, window_start, last_seen_at in session.execute(stmt, params):
+            found[sig].append({"id": gid, "window_start": window_start, "last_seen_at": last_seen_at})
+    return found
+
+
+def load_sketches(session: Session, texts: Dict[str, str]) -> Dict[str, Sequence[int]]:
+    # MinHash sketches by cleaned_hash; texts seen for the first time are
+    # sketched and stored.
+    sketches: Dict[str, bytes] = {}
+    for batch in bulk.chunked(sorted(texts), bulk.BATCH_SIZE):
+        stmt = select(models.MinHashSignature.cleaned_hash, models.MinHashSignature.signature).where(
+            models.MinHashSignature.cleaned_hash.in_(batch)
+        )
+        sketches.update((cleaned_hash, bytes(sig)) for cleaned_hash, sig in session.execute(stmt))
+
+    fresh = {cleaned_hash: minhash.sketch(text) for cleaned_hash, text in texts.items() if cleaned_hash not in sketches}
+    bulk.insert_ignore(
+        session,
+        models.MinHashSignature,
+        [{"cleaned_hash": cleaned_hash, "signature": sig} for cleaned_hash, sig in fresh.items()],
+        key_column="cleaned_hash",
+    )
+    sketches.update(fresh)
+    return {cleaned_hash: minhash.unpack(sig) for cleaned_hash, sig in sketches.items()}
+
 
-    cards: List[models.Card] = (
-        session.query(models.Card)
-        .filter(models.Card.duplicate_group_id.is_(None))
-        .order_by(models.Card.published_at.asc())
-        .all()
+def grouped_since(session: Session, lo: datetime, hi: datetime) -> List[Any]:
+    # Cards already grouped and published in [lo, hi]: the only ones a card
+    # of this chunk could join.
+    stmt = (
+        select(
+            models.Card.title,
+            models.Card.category,
+            models.Card.county,
+            models.Card.action_type,
+            models.Card.published_at,
+            models.CleanUpdate.cleaned_hash,
+            models.CleanUpdate.cleaned_text,
+            models.DuplicateGroup.signature,
+        )
+        .join(models.CleanUpdate, models.CleanUpdate.id == models.Card.clean_update_id)
+        .join(models.DuplicateGroup, models.DuplicateGroup.id == models.Card.duplicate_group_id)
+        .where(models.Card.published_at.between(lo, hi))
     )
+    return session.execute(stmt).all()
 
-    sig_map: Dict[str, List[models.Card]] = defaultdict(list)
-    for card in cards:
-        sig = signature(card)
-        sig_map[sig].append(card)
-
-    for sig, card_list in sig_map.items():
-        if len(card_list) == 1:
-            group_id = sha256(f"{sig}|{card_list[0].id}".encode("utf-8")).hexdigest()
-            group = models.DuplicateGroup(id=group_id, signature=sig)
-            session.add(group)
-            session.flush()
-            card_list[0].duplicate_group_id = group.id
-            grouped_cards += 1
-            inserted_groups += 1
-            continue
-
-        card_list.sort(key=lambda c: c.published_at or c.id)
-        current_group_id: Optional[str] = None
-        window_start = None
-
-        for card in card_list:
-            if window_start is None or (
-                card.published_at and window_start and card.published_at - window_start > WINDOW
-            ):
-                window_start = card.published_at
-                current_group_id = sha256(f"{sig}|{card.id}".encode("utf-8")).hexdigest()
-                group = models.DuplicateGroup(id=current_group_id, signature=sig)
-                session.add(group)
-                session.flush()
-                inserted_groups += 1
-
-            if current_group_id:
-                card.duplicate_group_id = current_group_id
-                grouped_cards += 1
+
+def segments(rows: Sequence[Any], span: timedelta = WINDOW) -> List[Sequence[Any]]:
+    # Consecutive runs of rows published within span of the run's first.
+    out: List[Sequence[Any]] = []
+    first = 0
+    for i, row in enumerate(rows):
+        if row.published_at - rows[first].published_at > span:
+            out.append(rows[first:i])
+            first = i
+    if rows:
+        out.append(rows[first:])
+    return out
+
+
+def near_signatures(session: Session, rows: Sequence[Any], threshold: float = DEDUP_JACCARD) -> Dict[str, str]:
+    # The signature each card is grouped under. An exact duplicate published
+    # at most WINDOW earlier decides it, so near mode only ever merges exact
+    # groups. Failing that, a card adopts the group signature of the most
+    # similar earlier card -- stored or earlier in this chunk -- that shares
+    # its category, county and action type, was published at most WINDOW
+    # before it and whose text is within threshold; otherwise it keeps its
+    # exact signature.
+    #
+    # Candidates come from LSH: the sketches of the cards in reach are
+    # bucketed band by band (under their category, county and action type),
+    # and only cards sharing a bucket are compared. A chunk can span months
+    # on a backfill, so it is taken in segments of at most WINDOW, each
+    # loading only the stored cards in its own reach; together with the
+    # chunk's cards still in reach, that keeps the work and memory in line
+    # with the card rate, not with the chunk's span or history.
+    resolved: Dict[str, str] = {}
+    # (published_at, exact signature, resolved signature, group key, sketch)
+    # of this chunk's cards already resolved.
+    done: List[Tuple[datetime, str, str, Tuple[Any, ...], Sequence[int]]] = []
+    for part in segments(rows):
+        lo = part[0].published_at - WINDOW
+        done = [entry for entry in done if entry[0] >= lo]
+        recent = grouped_since(session, lo, part[-1].published_at)
+        texts = {card.cleaned_hash: card.cleaned_text for card in recent}
+        texts.update((row.cleaned_hash, row.cleaned_text) for row in part)
+        sketches = load_sketches(session, texts)
+
+        exact: Dict[str, Tuple[datetime, str]] = {}
+        buckets: Dict[Tuple[Any, ...], List[Tuple[datetime, str, Sequence[int]]]] = defaultdict(list)
+        known = [
+            (
+                card.published_at,
+                signature(card),
+                card.signature,
+                (card.category, card.county, card.action_type),
+                sketches[card.cleaned_hash],
+            )
+            for card in recent
+        ]
+        for published_at, own, sig, key, sketch in known + done:
+            if own not in exact or published_at > exact[own][0]:
+                exact[own] = (published_at, sig)
+            entry = (published_at, sig, sketch)
+            for band, values in enumerate(minhash.band_keys(sketch)):
+                buckets[(key, band, values)].append(entry)
+
+        for row in part:
+            own = signature(row)
+            key = (row.category, row.county, row.action_type)
+            sketch = sketches[row.cleaned_hash]
+            bands = [(key, band, values) for band, values in enumerate(minhash.band_keys(sketch))]
+            best: Optional[Tuple[float, datetime, str]] = None
+            if own in exact and exact[own][0] >= row.published_at - WINDOW:
+                best = (1.0, exact[own][0], exact[own][1])
+            seen: Set[int] = set()
+            for bucket in bands if best is None else ():
+                for entry in buckets.get(bucket, ()):
+                    published_at, sig, other = entry
+                    if id(entry) in seen or published_at < row.published_at - WINDOW:
+                        continue
+                    seen.add(id(entry))
+                    score = minhash.similarity(sketch, other)
+                    if score >= threshold and (best is None or (score, published_at) > best[:2]):
+                        best = (score, published_at, sig)
+            resolved[row.id] = best[2] if best else own
+            exact[own] = (row.published_at, resolved[row.id])
+            entry = (row.published_at, resolved[row.id], sketch)
+            for bucket in bands:
+                buckets[bucket].append(entry)
+            done.append((row.published_at, own, resolved[row.id], key, sketch))
+    return resolved
+
+
+def dedup_chunk(session: Session, rows: Sequence[Any], near: bool = False) -> Tuple[int, int]:
+    # Rows arrive in published order. A card joins the latest window of its
+    # signature that opened at most WINDOW before it -- one already stored or
+    # one opened earlier in this chunk -- or opens a new one.
+    signatures = near_signatures(session, rows) if near else {row.id: signature(row) for row in rows}
+    by_sig: Dict[str, List[Any]] = defaultdict(list)
+    for row in rows:
+        by_sig[signatures[row.id]].append(row)
+    windows = open_windows(
+        session, {sig: (cards[0].published_at - WINDOW, cards[-1].published_at) for sig, cards in by_sig.items()}
+    )
+
+    created: List[Dict[str, Any]] = []
+    extended: Dict[str, Dict[str, Any]] = {}
+    assignments: List[Dict[str, str]] = []
+    for sig, cards in by_sig.items():
+        found = windows.get(sig, [])
+        starts = [window["window_start"] for window in found]
+        for card in cards:
+            published = card.published_at
+            i = bisect_right(starts, published) - 1
+            if i >= 0 and published - starts[i] <= WINDOW:
+                window = found[i]
+            else:
+                window = {
+                    "id": group_id(sig, card.id),
+                    "signature": sig,
+                    "window_start": published,
+                    "last_seen_at": published,
+                    "new": True,
+                }
+                found.insert(i + 1, window)
+                starts.insert(i + 1, published)
+                created.append(window)
+            if published > window["last_seen_at"]:
+                window["last_seen_at"] = published
+                if "new" not in window:
+                    extended[window["id"]] = window
+            assignments.append({"id": card.id, "duplicate_group_id": window["id"]})
+
+    bulk.insert_ignore(
+        session, models.DuplicateGroup, [{k: v for k, v in window.items() if k != "new"} for window in created]
+    )
+    bulk.update_rows(
+        session,
+        models.DuplicateGroup,
+        [{"id": gid, "last_seen_at": window["last_seen_at"]} for gid, window in extended.items()],
+    )
+    bulk.update_rows(session, models.Card, assignments)
+    return len(created), len(assignments)
+
+
+def deduplicate(chunk_size: int = CHUNK_SIZE, mode: str = DEDUP_MODE) -> int:
+    # Incremental: only ungrouped cards are read, and each is resolved
+    # against the stored windows of its signature, so a run costs what the
+    # new cards cost however many groups exist.
+    read_session = SessionLocal()
+    write_session = SessionLocal()
+    inserted_groups = 0
+    grouped_cards = 0
 
     try:
-        session.commit()
-        logger.info("Dedup complete. Groups created=%d, cards grouped=%d", inserted_groups, grouped_cards)
-    except IntegrityError:
-        session.rollback()
-        logger.warning("Dedup encountered duplicates during group insert; partial work may be present.")
+        # A whole run under one lock; a second run finds it taken and returns.
+        if not lock(read_session, wait=False):
+            logger.info("Another dedup run is in progress; skipping")
+            return 0
+        result = read_session.execute(
+            pending_cards(mode == "near").execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        for chunk in result.partitions():
+            try:
+                created, grouped = dedup_chunk(write_session, chunk, mode == "near")
+                write_session.commit()
+            except Exception as exc:  # pragma: no cover
+                write_session.rollback()
+                logger.error("Failed to group a chunk of %d cards: %s", len(chunk), exc)
+                continue
+            inserted_groups += created
+            grouped_cards += grouped
     finally:
-        session.close()
+        read_session.close()
+        write_session.close()
+
+    logger.info("Dedup complete. Groups created=%d, cards grouped=%d", inserted_groups, grouped_cards)
+    return grouped_cards
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+import re
+import struct
+from hashlib import shake_128
+from operator import eq
+from typing import List, Sequence, Set, Tuple
+
+# Sketch parameters are part of what is stored: changing them means
+# emptying minhash_signatures.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+
+_PACK = struct.Struct(f"<{NUM_PERM}I")
+_WORD = re.compile(r"\w+")
+
+# With 16 bands of 4 rows, texts at Jaccard 0.8 share a bucket with
+# probability ~0.9998 and at 0.5 with ~0.64, so any threshold from about 0.6
+# up finds its pairs; the threshold itself is applied to the estimated
+# similarity of each candidate pair.
+
+
+def shingles(text: str) -> Set[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def sketch(text: str) -> bytes:
+    # One extendable-output hash per shingle yields NUM_PERM independent
+    # 32-bit hash values at once; the sketch is their column-wise minimum.
+    rows = [_PACK.unpack(shake_128(shingle.encode("utf-8")).digest(_PACK.size)) for shingle in shingles(text)]
+    return _PACK.pack(*map(min, zip(*rows)))
+
+
+def unpack(signature: bytes) -> Sequence[int]:
+    return _PACK.unpack(signature)
+
+
+def band_keys(values: Sequence[int]) -> List[Tuple[int, ...]]:
+    # LSH: one bucket per band of ROWS values. Two texts share a band's
+    # bucket only if their sketches agree on that whole band.
+    return [tuple(values[i * ROWS : (i + 1) * ROWS]) for i in range(BANDS)]
+
+
+def similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    # Estimated Jaccard similarity of the two texts' shingle sets.
+    return sum(map(eq, left, right)) / NUM_PERM
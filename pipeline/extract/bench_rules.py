@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from pipeline import synthetic  # noqa: E402
+from pipeline.clean.clean_text import normalize_whitespace  # noqa: E402
+from pipeline.extract import engine, rules  # noqa: E402
+
+
+def corpus(count: int, seed: int, join: int = 1) -> List[str]:
+    # join > 1 glues synthetic updates together to approximate long NWS
+    # products, where per-pattern scanning costs the most.
+    rows = synthetic.generate(count * join, seed=seed, duplicate_rate=0.0, html_ratio=0.0)
+    texts = [normalize_whitespace(row["raw_text"]) for row in rows]
+    return [" ".join(texts[i : i + join]) for i in range(0, len(texts), join)]
+
+
+def run(name: str, classify: Callable, docs: List[str], rounds: int) -> list:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        outputs = [classify(text) for text in docs]
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<10} {len(docs) / best:>12,.0f} docs/s")
+    return outputs
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Throughput of the reference rules vs the compiled engine.")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--join", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    docs = corpus(args.count, args.seed, args.join)
+    print(f"{len(docs)} documents, ~{sum(map(len, docs)) // len(docs)} chars each, best of {args.rounds}")
+    want = run("reference", rules.classify, docs, args.rounds)
+    got = run("compiled", engine.classify, docs, args.rounds)
+    mismatches = sum(1 for a, b in zip(want, got) if a != b)
+    print(f"mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
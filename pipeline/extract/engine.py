@@ -0,0 +1,93 @@
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from pipeline.extract import gazetteer, rules
+
+
+# The detect_* tables as (feature, [(label, patterns)]), in precedence
+# order. infer_location is left out: it is a single gazetteer lookup.
+def rule_tables() -> List[Tuple[str, List[Tuple[str, Sequence[str]]]]]:
+    return [
+        ("mode", [("action", rules.ACTION_KEYWORDS)]),
+        ("category", list(rules.CATEGORY_KEYWORDS)),
+        ("urgency", [("high", rules.URGENCY_HIGH), ("medium", rules.URGENCY_MEDIUM)]),
+        ("action_type", list(rules.ACTION_TYPE_PATTERNS)),
+    ]
+
+
+def combine(patterns: Sequence[str]) -> "re.Pattern[str]":
+    # Any of the patterns, anywhere: one scan of the text instead of one
+    # re.search (and one re cache lookup) per pattern.
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+class RuleEngine:
+    # Each label's patterns are compiled into a single alternation. The
+    # detect_* functions return the first label with any matching pattern,
+    # so labels are still tried in table order and stop at the first hit;
+    # only the per-pattern loop is folded into the regex engine. A single
+    # alternation across labels would not do: a regex reports the leftmost
+    # match, not the highest-precedence one.
+    def __init__(self, tables=None, snapshot=None) -> None:
+        self.features: Dict[str, List[Tuple[str, Callable]]] = {}
+        for feature, entries in tables or rule_tables():
+            self.features[feature] = [(label, combine(patterns).search) for label, patterns in entries]
+
+        # Every pattern in the rule set, gated by its label's alternation, for
+        # the pattern-to-document index. Place names are looked up in the
+        # gazetteer's word trie instead of hundreds of regexes.
+        self.index_labels: List[Tuple[Callable, List[Tuple[str, Callable]]]] = []
+        for feature, entries in (snapshot or rules.snapshot())["features"].items():
+            if feature == "location":
+                continue
+            for _, patterns in entries:
+                checks = [(rules.pattern_key(pattern), re.compile(pattern).search) for pattern in patterns]
+                self.index_labels.append((combine(patterns).search, checks))
+        self.place_keys = {
+            place.name: rules.pattern_key(gazetteer.name_pattern(place.name)) for place in gazetteer.GAZETTEER.places
+        }
+
+    def first(self, feature: str, lowered: str) -> Optional[str]:
+        for label, search in self.features[feature]:
+            if search(lowered):
+                return label
+        return None
+
+    def matched_patterns(self, lowered: str) -> Set[str]:
+        keys = {self.place_keys[name] for name in gazetteer.GAZETTEER.all_names(lowered)}
+        for gate, checks in self.index_labels:
+            if not gate(lowered):
+                continue
+            if len(checks) == 1:
+                keys.add(checks[0][0])
+                continue
+            keys.update(key for key, search in checks if key not in keys and search(lowered))
+        return keys
+
+    def analyze(self, text: str) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        # Classification plus the keys of every pattern the text matches.
+        lowered = text.lower()
+        return self.classify_lowered(lowered), sorted(self.matched_patterns(lowered))
+
+    def classify(self, text: str) -> Dict[str, Optional[str]]:
+        return self.classify_lowered(text.lower())
+
+    def classify_lowered(self, lowered: str) -> Dict[str, Optional[str]]:
+        mode = self.first("mode", lowered) or "info"
+        return {
+            "mode": mode,
+            "category": self.first("category", lowered),
+            "urgency": self.first("urgency", lowered) or "low",
+            "action_type": self.first("action_type", lowered) if mode == "action" else None,
+        }
+
+
+ENGINE = RuleEngine()
+
+
+def classify(text: str) -> Dict[str, Optional[str]]:
+    return ENGINE.classify(text)
+
+
+def analyze(text: str) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    return ENGINE.analyze(text)
@@ -1,10 +1,14 @@
+import argparse
 import logging
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from hashlib import sha256
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT_DIR not in sys.path:
@@ -12,11 +16,21 @@ if ROOT_DIR not in sys.path:
 
 from backend.app.db import SessionLocal  # noqa: E402
 from backend.app import models  # noqa: E402
-from pipeline.extract import rules  # noqa: E402
+from pipeline import bulk, workqueue  # noqa: E402
+from pipeline.cache import ResultCache, classification_cache  # noqa: E402
+from pipeline.extract import engine, rules  # noqa: E402
+from pipeline.extract.rule_profile import RULES_PROFILE, RuleProfiler, finish, profiled_analyze  # noqa: E402
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = int(os.getenv("EXTRACT_CHUNK_SIZE", "2000"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Below this many texts a chunk is classified in-process.
+MIN_PARALLEL_ROWS = 200
+
+Classification = Dict[str, Optional[str]]
+
 
 def summarize(text: str) -> str:
     # Simple summary: first sentence or trimmed chunk.
@@ -31,69 +45,224 @@ def title_from_text(text: str) -> str:
     return " ".join(words[:10]) if words else "Update"
 
 
-def create_card_from_clean(clean: models.CleanUpdate) -> models.Card:
-    source = clean.raw_update.source if clean.raw_update else "unknown"
-    source_url = clean.raw_update.source_url if clean.raw_update else ""
-    published_at = clean.raw_update.published_at if clean.raw_update else None
-
-    mode = rules.detect_mode(clean.cleaned_text)
-    category = rules.detect_category(clean.cleaned_text) or "utilities"
-    urgency = rules.detect_urgency(clean.cleaned_text)
-    action_type = rules.detect_action_type(clean.cleaned_text) if mode == "action" else None
-    county, city = rules.infer_location(clean.cleaned_text, source)
-
-    title = title_from_text(clean.cleaned_text)
-    summary = summarize(clean.cleaned_text)
-
-    card_id_seed = f"{clean.id}-{category}-{mode}"
-    card_id = sha256(card_id_seed.encode("utf-8")).hexdigest()
-
-    return models.Card(
-        id=card_id,
-        clean_update_id=clean.id,
-        mode=mode,
-        category=category,
-        action_type=action_type,
-        urgency=urgency,
-        county=county,
-        city=city,
-        title=title,
-        summary=summary,
-        source=source,
-        source_url=source_url,
-        published_at=published_at,
+def analyze_texts(
+    texts: Sequence[str],
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+    profiler: Optional[RuleProfiler] = None,
+) -> List[Tuple[Classification, List[str]]]:
+    if profiler is not None:
+        return profiled_analyze(profiler, texts, pool, workers, MIN_PARALLEL_ROWS)
+    if pool is None or len(texts) < MIN_PARALLEL_ROWS:
+        return [engine.analyze(text) for text in texts]
+    return list(pool.map(engine.analyze, texts, chunksize=max(1, len(texts) // (workers * 4))))
+
+
+def classify_cached(
+    session: Session,
+    cache: ResultCache,
+    texts: Dict[str, str],
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+    profiler: Optional[RuleProfiler] = None,
+) -> Dict[str, Classification]:
+    # texts maps cleaned_hash -> cleaned_text. Classification depends only on
+    # the cleaned text, so each distinct hash is classified at most once.
+    # Whenever a hash is classified, its pattern hits are indexed with it.
+    results = cache.get_many(session, texts.keys())
+    todo = [key for key in texts if key not in results]
+    fresh: Dict[str, Classification] = {}
+    hits: List[Dict[str, str]] = []
+    analyzed = analyze_texts([texts[key] for key in todo], pool, workers, profiler)
+    for key, (classification, pattern_keys) in zip(todo, analyzed):
+        fresh[key] = classification
+        hits.extend({"pattern_key": pattern, "cleaned_hash": key} for pattern in pattern_keys)
+    # Key order, as in ResultCache.put_many: concurrent extract workers
+    # index overlapping texts.
+    hits.sort(key=lambda hit: (hit["pattern_key"], hit["cleaned_hash"]))
+    bulk.insert_ignore(session, models.RulePatternHit, hits, key_column="cleaned_hash")
+    cache.put_many(session, fresh)
+    results.update(fresh)
+    return results
+
+
+def record_rule_set(session: Session) -> str:
+    # Keeps every fingerprint's rules around so a later rule set can be
+    # diffed against the one that produced existing cards.
+    fingerprint = rules.fingerprint()
+    bulk.insert_ignore(
+        session, models.RuleSet, [{"fingerprint": fingerprint, "rules": rules.snapshot()}], key_column="fingerprint"
+    )
+    return fingerprint
+
+
+def prepare_classification(session: Session) -> ResultCache:
+    # Results cached under an older rule set can never be read again, and
+    # clean updates parked under one may now find a county.
+    fingerprint = record_rule_set(session)
+    session.execute(
+        delete(models.ClassificationCache).where(models.ClassificationCache.rules_fingerprint != fingerprint)
     )
+    workqueue.unpark(session, "extract", fingerprint)
+    session.commit()
+    return classification_cache(fingerprint)
+
+
+def card_row(
+    clean_id: str,
+    cleaned_text: str,
+    source: str,
+    source_url: str,
+    published_at: datetime,
+    classification: Classification,
+    rules_fingerprint: str,
+) -> Dict[str, Any]:
+    mode = classification["mode"]
+    category = classification["category"] or "utilities"
+    county, city = rules.infer_location(cleaned_text, source)
+
+    card_id_seed = f"{clean_id}-{category}-{mode}"
+    return {
+        "id": sha256(card_id_seed.encode("utf-8")).hexdigest(),
+        "clean_update_id": clean_id,
+        "mode": mode,
+        "category": category,
+        "action_type": classification["action_type"],
+        "urgency": classification["urgency"],
+        "urgency_rank": models.URGENCY_RANK[classification["urgency"]],
+        "county": county,
+        "city": city,
+        "title": title_from_text(cleaned_text),
+        "summary": summarize(cleaned_text),
+        "source": source,
+        "source_url": source_url,
+        "published_at": published_at,
+        "rules_fingerprint": rules_fingerprint,
+    }
+
+
+def extract_chunk(
+    session: Session,
+    rows: Sequence[Tuple[str, str, str, str, str, datetime]],
+    cache: ResultCache,
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+    profiler: Optional[RuleProfiler] = None,
+) -> List[Dict[str, Any]]:
+    # Rows are (clean id, cleaned_text, cleaned_hash, source, source_url,
+    # published_at), already joined to their raw update.
+    texts = {row[2]: row[1] for row in rows}
+    classifications = classify_cached(session, cache, texts, pool, workers, profiler)
+    fingerprint = cache.scope["rules_fingerprint"]
+    return [
+        card_row(clean_id, text, source, source_url, published_at, classifications[cleaned_hash], fingerprint)
+        for clean_id, text, cleaned_hash, source, source_url, published_at in rows
+    ]
 
 
-def extract() -> None:
+def write_card_batch(session: Session, records: Sequence[Dict[str, Any]]) -> int:
+    return len(bulk.insert_ignore(session, models.Card, records))
+
+
+def pending_clean_updates():
+    # Clean updates queued for extraction; see workqueue.claim.
+    return (
+        select(
+            models.CleanUpdate.id,
+            models.CleanUpdate.cleaned_text,
+            models.CleanUpdate.cleaned_hash,
+            models.RawUpdate.source,
+            models.RawUpdate.source_url,
+            models.RawUpdate.published_at,
+        )
+        .join(models.RawUpdate, models.RawUpdate.id == models.CleanUpdate.raw_update_id)
+        .join(models.WorkItem, models.WorkItem.item_id == models.CleanUpdate.id)
+    )
+
+
+def settle(session: Session, records: Sequence[Dict[str, Any]], fingerprint: str) -> List[Dict[str, Any]]:
+    # Takes the chunk's clean updates off the queue; those no county could
+    # be found for are parked until the rules change. Returns the placeable
+    # records (cards.county is NOT NULL; these used to fail one by one).
+    placed = [record for record in records if record["county"] is not None]
+    workqueue.complete(session, "extract", [record["clean_update_id"] for record in placed])
+    workqueue.park(
+        session, "extract", [record["clean_update_id"] for record in records if record["county"] is None], fingerprint
+    )
+    return placed
+
+
+def extract(
+    workers: int = EXTRACT_WORKERS,
+    chunk_size: int = CHUNK_SIZE,
+    shard: Optional[int] = None,
+    shards: int = 1,
+) -> int:
+    # Same shape as clean_text.ingest_clean: each chunk is claimed from the
+    # work queue, classified, written and taken off the queue in one
+    # transaction, so extract workers can run side by side.
     session = SessionLocal()
+
+    cache = prepare_classification(session)
+    fingerprint = cache.scope["rules_fingerprint"]
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    profiler = RuleProfiler() if RULES_PROFILE else None
+    buckets = workqueue.shard_buckets(shard, shards)
+    failed: Set[str] = set()
+    processed = 0
     inserted = 0
-    pending: List[models.CleanUpdate] = (
-        session.query(models.CleanUpdate)
-        .outerjoin(models.Card, models.Card.clean_update_id == models.CleanUpdate.id)
-        .filter(models.Card.id.is_(None))
-        .all()
-    )
+    skipped = 0
+    unplaced = 0
+
+    try:
+        while True:
+            claim = workqueue.claim(pending_clean_updates(), "extract", chunk_size, buckets, failed)
+            rows = [tuple(row) for row in session.execute(claim)]
+            if not rows:
+                session.rollback()
+                break
+            processed += len(rows)
+            try:
+                records = extract_chunk(session, rows, cache, pool, workers, profiler)
+                placed = settle(session, records, fingerprint)
+                chunk_inserted = write_card_batch(session, placed)
+                session.commit()
+            except Exception as exc:  # pragma: no cover
+                # The claim is released; the next run retries these rows.
+                session.rollback()
+                failed.update(row[0] for row in rows)
+                logger.error("Failed to insert cards chunk of %d rows: %s", len(rows), exc)
+                continue
+            inserted += chunk_inserted
+            skipped += len(placed) - chunk_inserted
+            unplaced += len(records) - len(placed)
+            logger.info("Extracted %d clean updates so far (inserted=%d)", processed, inserted)
+    finally:
+        if pool:
+            pool.shutdown()
+        session.close()
 
-    logger.info("Found %d clean updates without cards", len(pending))
+    logger.info(
+        "Done. Processed=%d inserted=%d skipped=%d no_county=%d classification_cache_hits=%d",
+        processed,
+        inserted,
+        skipped,
+        unplaced,
+        cache.hits,
+    )
+    finish(profiler)
+    return inserted
 
-    for clean in pending:
-        card = create_card_from_clean(clean)
-        session.add(card)
-        try:
-            session.commit()
-            inserted += 1
-            logger.info("Inserted card for clean_update_id=%s", clean.id)
-        except IntegrityError:
-            session.rollback()
-            logger.info("Skip duplicate card for clean_update_id=%s", clean.id)
-        except Exception as exc:  # pragma: no cover
-            session.rollback()
-            logger.error("Failed to insert card for clean_update_id=%s: %s", clean.id, exc)
 
-    logger.info("Done. Inserted=%d", inserted)
-    session.close()
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Extract cards from queued clean updates.")
+    parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS, help="processes classifying each chunk")
+    parser.add_argument("--shard", type=int, default=None, help="only take this shard of the queue (0-based)")
+    parser.add_argument("--shards", type=int, default=1, help="number of shards the queue is split into")
+    args = parser.parse_args(argv)
+    extract(args.workers, shard=args.shard, shards=args.shards)
 
 
 if __name__ == "__main__":
-    extract()
+    main()
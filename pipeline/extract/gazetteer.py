@@ -0,0 +1,119 @@
+import csv
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "florida_places.csv")
+)
+
+# Names are matched on whole words: text and names are both reduced to runs
+# of lowercase letters and digits, so "Miami-Dade", "miami dade" and
+# "MIAMI  DADE" are the same name and "hollywood" never hits "hollywoodland".
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class Place(NamedTuple):
+    county: str
+    city: Optional[str]
+    name: str
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def name_pattern(name: str) -> str:
+    # The regex equivalent of matching `name` as a word sequence; used to
+    # key the name in the pattern-to-document index.
+    return "(?<![a-z0-9])" + "[^a-z0-9]+".join(words(name)) + "(?![a-z0-9])"
+
+
+class Gazetteer:
+    def __init__(self, places: Iterable[Place]) -> None:
+        self.places: List[Place] = []
+        # Word trie; a node's None key holds the place whose name ends there.
+        self._trie: Dict[Optional[str], dict] = {}
+        for place in places:
+            node = self._trie
+            for word in words(place.name):
+                node = node.setdefault(word, {})
+            if None in node:
+                raise ValueError(f"Duplicate gazetteer name: {place.name}")
+            node[None] = place
+            self.places.append(place)
+
+    @classmethod
+    def from_csv(cls, path: str = GAZETTEER_PATH) -> "Gazetteer":
+        with open(path, newline="", encoding="utf-8") as handle:
+            rows = list(csv.DictReader(handle))
+        return cls(Place(row["county"], row["city"] or None, row["name"]) for row in rows)
+
+    def _walk(self, tokens: List[str], start: int) -> List[Tuple[int, Place]]:
+        # Every place whose name starts at tokens[start], shortest first.
+        found: List[Tuple[int, Place]] = []
+        node = self._trie
+        for end in range(start, len(tokens)):
+            node = node.get(tokens[end])
+            if node is None:
+                break
+            if None in node:
+                found.append((end + 1, node[None]))
+        return found
+
+    def find(self, text: str) -> List[Place]:
+        # Leftmost-longest, non-overlapping: "miami beach" is one match, not
+        # "miami" followed by a stray "beach".
+        tokens = words(text)
+        matches: List[Place] = []
+        i = 0
+        while i < len(tokens):
+            found = self._walk(tokens, i) if tokens[i] in self._trie else None
+            if found:
+                i, place = found[-1]
+                matches.append(place)
+            else:
+                i += 1
+        return matches
+
+    def all_names(self, lowered: str) -> Set[str]:
+        # Every name occurring anywhere, overlaps included, for the index.
+        tokens = words(lowered)
+        names: Set[str] = set()
+        for i, token in enumerate(tokens):
+            if token in self._trie:
+                names.update(place.name for _, place in self._walk(tokens, i))
+        return names
+
+    def locate(self, text: str, source: str) -> Tuple[Optional[str], Optional[str]]:
+        # A county agency's feed is about its own county: names there win.
+        # Otherwise the first place named decides the county, and the city is
+        # the first city mentioned in that county.
+        source_places = self.find(source)
+        source_county = source_places[0].county if source_places else None
+        matches = self.find(text)
+        if not matches:
+            return source_county, None
+
+        county = matches[0].county
+        if source_county and any(place.county == source_county for place in matches):
+            county = source_county
+        city = next((place.city for place in matches if place.county == county and place.city), None)
+        return county, city
+
+    def counties(self) -> List[str]:
+        return sorted({place.county for place in self.places})
+
+    def cities(self, county: str) -> List[str]:
+        return sorted({place.city for place in self.places if place.county == county and place.city})
+
+    def entries(self) -> List[List]:
+        # Rule-snapshot form: [[county|city, [patterns]], ...], sorted so the
+        # file's row order never reads as a precedence change.
+        labels: Dict[str, List[str]] = {}
+        for place in self.places:
+            labels.setdefault(f"{place.county}|{place.city or ''}", []).append(name_pattern(place.name))
+        return [[label, sorted(patterns)] for label, patterns in sorted(labels.items())]
+
+
+GAZETTEER = Gazetteer.from_csv()
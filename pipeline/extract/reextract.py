@@ -0,0 +1,292 @@
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, distinct, select, update
+from sqlalchemy.orm import Session
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.app.db import SessionLocal  # noqa: E402
+from backend.app import models  # noqa: E402
+from pipeline import bulk, workqueue  # noqa: E402
+from pipeline.cache import ResultCache, classification_cache  # noqa: E402
+from pipeline.extract import rules  # noqa: E402
+from pipeline.extract.rule_profile import RULES_PROFILE, RuleProfiler, finish  # noqa: E402
+from pipeline.extract.extract_cards import (  # noqa: E402
+    CHUNK_SIZE,
+    EXTRACT_WORKERS,
+    extract_chunk,
+    record_rule_set,
+    write_card_batch,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+_REGEX_META = set(".^$*+?{}[]()|\\")
+_QUANTIFIERS = set("?*{")
+# Shorter literals barely narrow a text search; scan everything instead.
+MIN_PREFILTER_LENGTH = 3
+
+
+def has_top_level_alternation(pattern: str) -> bool:
+    # A "|" outside every group and character class splits the whole
+    # pattern, so text before it says nothing about the later alternatives.
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            if char == "]":
+                in_class = False
+        elif char == "[":
+            in_class = True
+            # A "]" right after "[" or "[^" is a literal member.
+            if pattern[i + 1 : i + 2] == "^":
+                i += 1
+            if pattern[i + 1 : i + 2] == "]":
+                i += 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def literal_prefix(pattern: str) -> str:
+    # Leading literal text of a regex: what any match must start with. A
+    # pattern with top-level alternatives has none.
+    if has_top_level_alternation(pattern):
+        return ""
+    i = 0
+    while pattern.startswith("\\b", i):
+        i += 2
+    out: List[str] = []
+    while i < len(pattern):
+        char = pattern[i]
+        step = 1
+        if char == "\\":
+            escaped = pattern[i + 1 : i + 2]
+            if not escaped or escaped.isalnum():
+                break
+            char = escaped
+            step = 2
+        elif char in _REGEX_META:
+            break
+        if pattern[i + step : i + step + 1] in _QUANTIFIERS:
+            break
+        out.append(char)
+        i += step
+    return "".join(out)
+
+
+def all_patterns(snapshot: Dict[str, Any]) -> Set[str]:
+    return {pattern for entries in snapshot["features"].values() for _, patterns in entries for pattern in patterns}
+
+
+def changed_patterns(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Set[str]]:
+    # Patterns whose matches could resolve differently under `new`. A
+    # document matching none of them keeps every feature value. None means
+    # the diff cannot be localized (detect_* logic or the feature set moved).
+    if old.get("version") != new["version"] or set(old["features"]) != set(new["features"]):
+        return None
+
+    changed: Set[str] = set()
+    for feature, new_entries in new["features"].items():
+        old_entries = old["features"][feature]
+        old_pairs = {(label, pattern) for label, patterns in old_entries for pattern in patterns}
+        new_pairs = {(label, pattern) for label, patterns in new_entries for pattern in patterns}
+        changed.update(pattern for _, pattern in old_pairs ^ new_pairs)
+
+        # Reordering labels changes precedence between them; new or dropped
+        # labels are already covered through their patterns.
+        new_rank = {label: rank for rank, (label, _) in reversed(list(enumerate(new_entries)))}
+        shared = [label for label, _ in old_entries if label in new_rank]
+        moved: Set[str] = set()
+        for i, label in enumerate(shared):
+            for other in shared[i + 1 :]:
+                if new_rank[label] > new_rank[other]:
+                    moved.update((label, other))
+        changed.update(pattern for label, pattern in old_pairs | new_pairs if label in moved)
+    return changed
+
+
+def stale_cards(fingerprint: Optional[str]):
+    if fingerprint is None:
+        return models.Card.rules_fingerprint.is_(None)
+    return models.Card.rules_fingerprint == fingerprint
+
+
+def scan_pattern(session: Session, old_fingerprint: Optional[str], pattern: str) -> Set[str]:
+    # A pattern the old rule set never had is not in the index yet: find
+    # the stale cards' texts it matches (narrowed in SQL by its literal
+    # prefix) and index them now.
+    stmt = (
+        select(distinct(models.CleanUpdate.cleaned_hash), models.CleanUpdate.cleaned_text)
+        .join(models.Card, models.Card.clean_update_id == models.CleanUpdate.id)
+        .where(stale_cards(old_fingerprint))
+    )
+    prefix = literal_prefix(pattern)
+    if len(prefix) >= MIN_PREFILTER_LENGTH:
+        stmt = stmt.where(models.CleanUpdate.cleaned_text.icontains(prefix, autoescape=True))
+
+    compiled = re.compile(pattern)
+    key = rules.pattern_key(pattern)
+    hashes = {cleaned_hash for cleaned_hash, text in session.execute(stmt) if compiled.search(text.lower())}
+    hits = [{"pattern_key": key, "cleaned_hash": cleaned_hash} for cleaned_hash in hashes]
+    bulk.insert_ignore(session, models.RulePatternHit, hits, key_column="cleaned_hash")
+    return hashes
+
+
+def affected_hashes(
+    session: Session, old_fingerprint: str, old: Dict[str, Any], changed: Set[str]
+) -> Set[str]:
+    known = all_patterns(old)
+    indexed = [rules.pattern_key(pattern) for pattern in changed if pattern in known]
+    hashes: Set[str] = set()
+    for batch in bulk.chunked(indexed, bulk.BATCH_SIZE):
+        stmt = select(distinct(models.RulePatternHit.cleaned_hash)).where(
+            models.RulePatternHit.pattern_key.in_(batch)
+        )
+        hashes.update(session.execute(stmt).scalars())
+    for pattern in changed - known:
+        hashes |= scan_pattern(session, old_fingerprint, pattern)
+    return hashes
+
+
+def stale_rows(old_fingerprint: Optional[str]):
+    return (
+        select(
+            models.CleanUpdate.id,
+            models.CleanUpdate.cleaned_text,
+            models.CleanUpdate.cleaned_hash,
+            models.RawUpdate.source,
+            models.RawUpdate.source_url,
+            models.RawUpdate.published_at,
+            models.Card.id,
+        )
+        .join(models.CleanUpdate, models.CleanUpdate.id == models.Card.clean_update_id)
+        .join(models.RawUpdate, models.RawUpdate.id == models.CleanUpdate.raw_update_id)
+        .where(stale_cards(old_fingerprint))
+    )
+
+
+def rebuild_chunk(
+    session: Session,
+    rows: List[Tuple],
+    cache: ResultCache,
+    pool: Optional[ProcessPoolExecutor],
+    workers: int,
+    profiler: Optional[RuleProfiler] = None,
+) -> Tuple[int, int]:
+    # Rebuilt cards replace the stale ones outright: card ids derive from
+    # category and mode, and dedup regroups the new rows on its next pass.
+    # A clean update that no longer finds a county waits in the extract
+    # queue for the next rule change, as if it had never been placed.
+    sources = {row[0]: row[:6] for row in rows}
+    records = extract_chunk(session, list(sources.values()), cache, pool, workers, profiler)
+    session.execute(delete(models.Card).where(models.Card.id.in_([row[6] for row in rows])))
+    placed = [record for record in records if record["county"] is not None]
+    workqueue.enqueue_parked(
+        session,
+        "extract",
+        [record["clean_update_id"] for record in records if record["county"] is None],
+        cache.scope["rules_fingerprint"],
+    )
+    inserted = write_card_batch(session, placed)
+    session.commit()
+    return inserted, len(rows)
+
+
+def reextract(workers: int = EXTRACT_WORKERS, chunk_size: int = CHUNK_SIZE) -> int:
+    session = SessionLocal()
+    read_session = SessionLocal()
+    fingerprint = record_rule_set(session)
+    current = rules.snapshot()
+    session.commit()
+
+    stale = session.execute(
+        select(distinct(models.Card.rules_fingerprint)).where(
+            models.Card.rules_fingerprint.is_distinct_from(fingerprint)
+        )
+    ).scalars().all()
+    if not stale:
+        logger.info("All cards already match rules %s", fingerprint)
+        session.close()
+        read_session.close()
+        return 0
+
+    cache = classification_cache(fingerprint)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    profiler = RuleProfiler() if RULES_PROFILE else None
+    rebuilt = 0
+    try:
+        for old_fingerprint in stale:
+            old_rules = session.get(models.RuleSet, old_fingerprint) if old_fingerprint else None
+            changed = changed_patterns(old_rules.rules, current) if old_rules else None
+
+            if changed is None:
+                # Unknown or incompatible rules: every card is suspect.
+                logger.info("Rules %s cannot be diffed; re-extracting all of its cards", old_fingerprint)
+                result = read_session.execute(
+                    stale_rows(old_fingerprint).execution_options(stream_results=True, yield_per=chunk_size)
+                )
+                chunks = ([tuple(row) for row in chunk] for chunk in result.partitions())
+            else:
+                hashes = affected_hashes(session, old_fingerprint, old_rules.rules, changed)
+                session.commit()
+                logger.info(
+                    "Rules %s -> %s: %d changed patterns touch %d texts",
+                    old_fingerprint,
+                    fingerprint,
+                    len(changed),
+                    len(hashes),
+                )
+                chunks = (
+                    [
+                        tuple(row)
+                        for row in session.execute(
+                            stale_rows(old_fingerprint).where(models.CleanUpdate.cleaned_hash.in_(batch))
+                        )
+                    ]
+                    for batch in bulk.chunked(sorted(hashes), chunk_size)
+                )
+
+            for rows in chunks:
+                if not rows:
+                    continue
+                inserted, replaced = rebuild_chunk(session, rows, cache, pool, workers, profiler)
+                rebuilt += replaced
+                logger.info("Re-extracted %d cards (%d placed)", replaced, inserted)
+
+            # Whatever the diff did not touch is unchanged under the new rules.
+            session.execute(
+                update(models.Card).where(stale_cards(old_fingerprint)).values(rules_fingerprint=fingerprint)
+            )
+            session.commit()
+    finally:
+        if pool:
+            pool.shutdown()
+        read_session.close()
+        session.close()
+
+    logger.info("Done. Re-extracted=%d cards across %d stale rule sets", rebuilt, len(stale))
+    finish(profiler)
+    return rebuilt
+
+
+if __name__ == "__main__":
+    reextract()
@@ -0,0 +1,201 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import distinct, select
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from pipeline.extract import engine, rules  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: when set, extraction runs record per-pattern statistics and write
+# them to this path as JSON when they finish.
+RULES_PROFILE = os.getenv("RULES_PROFILE")
+
+Stats = Tuple[int, List[int], List[int], List[int]]
+
+
+class RuleProfiler:
+    # Evaluates the rule tables the way the detect_* functions do -- labels
+    # in precedence order, patterns in list order, stopping at the first
+    # hit -- timing every re.search. The counts therefore show what each
+    # pattern costs under the real short-circuiting: a pattern that is never
+    # evaluated is shadowed, one that is evaluated but never hits is dead.
+    def __init__(self, tables=None) -> None:
+        self.patterns: List[Tuple[str, str, str]] = []
+        self.features: Dict[str, List[Tuple[str, List[Tuple[int, Any]]]]] = {}
+        for feature, entries in tables or engine.rule_tables():
+            labels = []
+            for label, patterns in entries:
+                compiled = []
+                for pattern in patterns:
+                    compiled.append((len(self.patterns), re.compile(pattern).search))
+                    self.patterns.append((feature, label, pattern))
+                labels.append((label, compiled))
+            self.features[feature] = labels
+        self.documents = 0
+        self.evaluations = [0] * len(self.patterns)
+        self.hits = [0] * len(self.patterns)
+        self.nanos = [0] * len(self.patterns)
+
+    def first(self, feature: str, lowered: str) -> Optional[str]:
+        clock = time.perf_counter_ns
+        for label, compiled in self.features[feature]:
+            for index, search in compiled:
+                started = clock()
+                matched = search(lowered)
+                self.nanos[index] += clock() - started
+                self.evaluations[index] += 1
+                if matched:
+                    self.hits[index] += 1
+                    return label
+        return None
+
+    def classify(self, text: str) -> Dict[str, Optional[str]]:
+        lowered = text.lower()
+        self.documents += 1
+        mode = self.first("mode", lowered) or "info"
+        return {
+            "mode": mode,
+            "category": self.first("category", lowered),
+            "urgency": self.first("urgency", lowered) or "low",
+            "action_type": self.first("action_type", lowered) if mode == "action" else None,
+        }
+
+    def analyze(self, text: str) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        # Drop-in for engine.analyze: the classification comes from the timed
+        # evaluation, the index keys from the compiled engine.
+        return self.classify(text), sorted(engine.ENGINE.matched_patterns(text.lower()))
+
+    def stats(self) -> Stats:
+        return self.documents, self.evaluations, self.hits, self.nanos
+
+    def merge(self, stats: Stats) -> None:
+        documents, evaluations, hits, nanos = stats
+        self.documents += documents
+        for index in range(len(self.patterns)):
+            self.evaluations[index] += evaluations[index]
+            self.hits[index] += hits[index]
+            self.nanos[index] += nanos[index]
+
+    def rows(self) -> List[Dict[str, Any]]:
+        # Slowest first: cumulative time is what reordering or rewriting a
+        # pattern can win back.
+        out = []
+        for index, (feature, label, pattern) in enumerate(self.patterns):
+            evaluations = self.evaluations[index]
+            out.append(
+                {
+                    "feature": feature,
+                    "label": label,
+                    "pattern": pattern,
+                    "pattern_key": rules.pattern_key(pattern),
+                    "evaluations": evaluations,
+                    "hits": self.hits[index],
+                    "hit_rate": self.hits[index] / evaluations if evaluations else 0.0,
+                    "seconds": self.nanos[index] / 1e9,
+                    "mean_us": self.nanos[index] / evaluations / 1e3 if evaluations else 0.0,
+                }
+            )
+        return sorted(out, key=lambda row: (-row["seconds"], row["feature"], row["label"], row["pattern"]))
+
+    def report(self) -> str:
+        rows = self.rows()
+        total = sum(row["seconds"] for row in rows)
+        lines = [
+            f"{self.documents} documents, {total:.3f}s in rule patterns",
+            f"{'feature':<12} {'label':<30} {'pattern':<34} "
+            f"{'evals':>10} {'hits':>9} {'hit%':>6} {'total ms':>9} {'us/eval':>8}",
+        ]
+        for row in rows:
+            flag = "  never evaluated" if not row["evaluations"] else "  dead" if not row["hits"] else ""
+            lines.append(
+                f"{row['feature']:<12} {row['label'][:30]:<30} {row['pattern'][:34]:<34} "
+                f"{row['evaluations']:>10,} {row['hits']:>9,} {row['hit_rate'] * 100:>5.1f}% "
+                f"{row['seconds'] * 1e3:>9.1f} {row['mean_us']:>8.2f}{flag}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        payload = {
+            "rules_fingerprint": rules.fingerprint(),
+            "documents": self.documents,
+            "patterns": self.rows(),
+        }
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2)
+
+
+def profile_batch(texts: Sequence[str]) -> Tuple[List[Tuple[Dict[str, Optional[str]], List[str]]], Stats]:
+    # Worker entry point: one profiler per batch, its counters shipped back
+    # to be merged into the parent's.
+    profiler = RuleProfiler()
+    return [profiler.analyze(text) for text in texts], profiler.stats()
+
+
+def profiled_analyze(
+    profiler: RuleProfiler,
+    texts: Sequence[str],
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+    min_parallel: int = 200,
+) -> List[Tuple[Dict[str, Optional[str]], List[str]]]:
+    if pool is None or len(texts) < min_parallel:
+        return [profiler.analyze(text) for text in texts]
+    size = max(1, -(-len(texts) // workers))
+    batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+    out: List[Tuple[Dict[str, Optional[str]], List[str]]] = []
+    for analyses, stats in pool.map(profile_batch, batches):
+        out.extend(analyses)
+        profiler.merge(stats)
+    return out
+
+
+def finish(profiler: Optional[RuleProfiler], path: Optional[str] = RULES_PROFILE) -> None:
+    if profiler is None or not path:
+        return
+    logger.info("Rule profile (%d documents):\n%s", profiler.documents, profiler.report())
+    profiler.dump(path)
+    logger.info("Wrote rule profile to %s", path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    # Profiles the rules over the distinct cleaned texts already in the
+    # database, without touching cards.
+    from backend.app.db import SessionLocal
+    from backend.app import models
+
+    parser = argparse.ArgumentParser(description="Per-pattern evaluation counts, hits and time over clean_updates.")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", default=RULES_PROFILE)
+    args = parser.parse_args(argv)
+
+    profiler = RuleProfiler()
+    session = SessionLocal()
+    try:
+        stmt = select(distinct(models.CleanUpdate.cleaned_hash), models.CleanUpdate.cleaned_text)
+        if args.limit:
+            stmt = stmt.limit(args.limit)
+        result = session.execute(stmt.execution_options(stream_results=True, yield_per=2000))
+        for _, text in result:
+            profiler.classify(text)
+    finally:
+        session.close()
+
+    if args.json_path:
+        profiler.dump(args.json_path)
+    print(profiler.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import json
 import re
-from typing import Optional, Tuple
+from hashlib import sha256
+from typing import Any, Dict, Optional, Tuple
+
+from pipeline.extract import gazetteer
+
+# Bump when detect_* logic changes in a way the tables below do not show.
+RULES_VERSION = 2
 
 # Keyword lists for classification
 ACTION_KEYWORDS = [
@@ -57,26 +64,6 @@ ACTION_TYPE_PATTERNS = [
     ("Supply Distribution", [r"distribution", r"food", r"water", r"ice", r"supplies"] ),
 ]
 
-BROWARD_CITIES = [
-    "fort lauderdale",
-    "plantation",
-    "pompano",
-    "coral springs",
-    "hollywood",
-    "broward",
-]
-
-MIAMI_DADE_CITIES = [
-    "miami",
-    "miami beach",
-    "hialeah",
-    "doral",
-    "homestead",
-    "coral gables",
-    "miami-dade",
-    "miami dade",
-]
-
 
 def detect_mode(text: str) -> str:
     lowered = text.lower()
@@ -116,25 +103,41 @@ def detect_action_type(text: str) -> Optional[str]:
 
 
 def infer_location(text: str, source: str) -> Tuple[Optional[str], Optional[str]]:
-    lowered = text.lower()
-    county = None
-    city = None
-
-    if "broward" in source.lower():
-        county = "broward"
-    if "miami" in source.lower():
-        county = "miami-dade"
-
-    for c in BROWARD_CITIES:
-        if c in lowered:
-            county = "broward"
-            city = c.title()
-            break
-    if county is None:
-        for c in MIAMI_DADE_CITIES:
-            if c in lowered:
-                county = "miami-dade"
-                city = c.title()
-                break
-
-    return county, city
+    return gazetteer.GAZETTEER.locate(text, source)
+
+
+def classify(text: str) -> Dict[str, Optional[str]]:
+    mode = detect_mode(text)
+    return {
+        "mode": mode,
+        "category": detect_category(text),
+        "urgency": detect_urgency(text),
+        "action_type": detect_action_type(text) if mode == "action" else None,
+    }
+
+
+def snapshot() -> Dict[str, Any]:
+    # The whole rule set as plain data, feature by feature in precedence
+    # order: [[label, [patterns]], ...]. Location comes from the gazetteer,
+    # one word-sequence pattern per place name.
+    return {
+        "version": RULES_VERSION,
+        "features": {
+            "mode": [["action", list(ACTION_KEYWORDS)]],
+            "category": [[label, list(patterns)] for label, patterns in CATEGORY_KEYWORDS],
+            "urgency": [["high", list(URGENCY_HIGH)], ["medium", list(URGENCY_MEDIUM)]],
+            "action_type": [[label, list(patterns)] for label, patterns in ACTION_TYPE_PATTERNS],
+            "location": gazetteer.GAZETTEER.entries(),
+        },
+    }
+
+
+def fingerprint() -> str:
+    # Identifies the rule set: anything derived from the rules (cached
+    # classifications, cards) is stale once this changes.
+    payload = json.dumps(snapshot(), sort_keys=True)
+    return sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def pattern_key(pattern: str) -> str:
+    return sha256(pattern.encode("utf-8")).hexdigest()[:16]
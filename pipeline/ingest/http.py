@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+from hashlib import sha256
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+USER_AGENT = "hurricane-triage/0.1 (contact: none)"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Set HTTP_CACHE_DIR to an empty string to disable conditional requests.
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(ROOT_DIR, ".cache", "http"))
+
+
+def build_session(pool_size: int = 10, retries: int = 5, backoff: float = 0.5) -> requests.Session:
+    # One pooled session per fetcher: connections are reused across pages and
+    # worker threads, and transient upstream errors are retried with backoff.
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+class ConditionalCache:
+    # Remembers ETag/Last-Modified per request URL on disk. Validators from a
+    # fetch are only staged; the adapter commits them after the rows are in
+    # the database, so a failed write is never masked by a later 304.
+    def __init__(self, directory: str = HTTP_CACHE_DIR) -> None:
+        self.directory = directory
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def request_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return requests.Request("GET", url, params=params).prepare().url or url
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def request_headers(self, key: str) -> Dict[str, str]:
+        try:
+            with open(self._path(key), encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def stage(self, key: str, response: requests.Response) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return
+        with self._lock:
+            self._pending[key] = {"url": key, "etag": etag, "last_modified": last_modified}
+
+    def commit(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        for key, entry in pending.items():
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(entry, fh)
+            os.replace(tmp_path, path)
+
+    def discard(self) -> None:
+        with self._lock:
+            self._pending = {}
@@ -1,44 +1,131 @@
 import os
 import sys
 import logging
-from datetime import datetime, timezone
-from hashlib import sha256
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
 
 import requests
-from sqlalchemy.exc import IntegrityError
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
-from backend.app.db import SessionLocal  # noqa: E402
-from backend.app import models  # noqa: E402
+from pipeline import bulk  # noqa: E402
+from pipeline.ingest.base import SourceAdapter  # noqa: E402
+from pipeline.ingest.http import HTTP_CACHE_DIR, ConditionalCache, build_session  # noqa: E402
+from pipeline.ingest.registry import register  # noqa: E402
 
-NWS_ALERTS_URL = "https://api.weather.gov/alerts"
+NWS_ALERTS_URL = os.getenv("NWS_ALERTS_URL", "https://api.weather.gov/alerts")
 DATE_START = datetime(2022, 9, 26, tzinfo=timezone.utc)
 DATE_END = datetime(2022, 9, 30, 23, 59, 59, tzinfo=timezone.utc)
 SOURCE_NAME = "NWS"
 
+# The API caps a page at 500 features; larger windows are followed via pagination.next.
+PAGE_LIMIT = 500
+SLICE_SIZE = timedelta(hours=12)
+FETCH_WORKERS = int(os.getenv("NWS_FETCH_WORKERS", "8"))
+REQUEST_TIMEOUT = 30
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
 
-def fetch_alerts() -> List[Dict[str, Any]]:
-    params = {
-        "start": DATE_START.isoformat(),
-        "end": DATE_END.isoformat(),
+def time_slices(start: datetime, end: datetime, size: timedelta) -> List[Tuple[datetime, datetime]]:
+    slices = []
+    cursor = start
+    while cursor < end:
+        slice_end = min(cursor + size, end)
+        slices.append((cursor, slice_end))
+        cursor = slice_end
+    return slices or [(start, end)]
+
+
+def fetch_slice(
+    session: requests.Session,
+    start: datetime,
+    end: datetime,
+    cache: Optional[ConditionalCache] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    url: Optional[str] = NWS_ALERTS_URL
+    params: Optional[Dict[str, Any]] = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
         "status": "actual",
-        "limit": 200,
+        "limit": PAGE_LIMIT,
     }
-    headers = {"User-Agent": "hurricane-triage/0.1 (contact: none)"}
-    resp = requests.get(NWS_ALERTS_URL, params=params, headers=headers, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-    return data.get("features", [])
-
+    features: List[Dict[str, Any]] = []
+    seen_pages = set()
+
+    while url and url not in seen_pages:
+        seen_pages.add(url)
+        # Only the first page is conditional: it carries the newest alerts,
+        # so an unchanged first page means the whole slice is unchanged.
+        cache_key = cache.request_key(url, params) if cache and not features else None
+        headers = cache.request_headers(cache_key) if cache_key else None
+        resp = session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        if resp.status_code == 304:
+            logger.info("Not modified: %s..%s", start.isoformat(), end.isoformat())
+            return None
+        resp.raise_for_status()
+        if cache_key:
+            cache.stage(cache_key, resp)
+        data = resp.json()
+        page = data.get("features", [])
+        features.extend(page)
+        if not page:
+            break
+        # The next link already carries the cursor and the original filters.
+        url = (data.get("pagination") or {}).get("next")
+        params = None
+
+    logger.info("Fetched %d alerts for %s..%s", len(features), start.isoformat(), end.isoformat())
+    return features
+
+
+def fetch_alerts(
+    start: datetime = DATE_START,
+    end: datetime = DATE_END,
+    slice_size: timedelta = SLICE_SIZE,
+    workers: int = FETCH_WORKERS,
+    session: Optional[requests.Session] = None,
+    cache: Optional[ConditionalCache] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    slices = time_slices(start, end, slice_size)
+    workers = max(1, min(workers, len(slices)))
+    own_session = session is None
+    if session is None:
+        session = build_session(pool_size=workers)
 
-def within_scope(feature: Dict[str, Any]) -> bool:
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pages = list(pool.map(lambda window: fetch_slice(session, *window, cache=cache), slices))
+    finally:
+        if own_session:
+            session.close()
+
+    if all(page is None for page in pages):
+        return None
+
+    # Slice edges are inclusive on both sides, so an alert sent exactly on a
+    # boundary can come back twice.
+    features: List[Dict[str, Any]] = []
+    seen_ids = set()
+    for page in pages:
+        for feature in page or []:
+            feature_id = feature.get("id") or (feature.get("properties") or {}).get("id")
+            if feature_id:
+                if feature_id in seen_ids:
+                    continue
+                seen_ids.add(feature_id)
+            features.append(feature)
+    return features
+
+
+def within_scope(
+    feature: Dict[str, Any], start: Optional[datetime] = DATE_START, end: Optional[datetime] = DATE_END
+) -> bool:
+    # None leaves that side of the window open; the area check always applies.
     props = feature.get("properties", {})
     sent = props.get("sent")
     if not sent:
@@ -47,7 +134,7 @@ def within_scope(feature: Dict[str, Any]) -> bool:
         sent_dt = datetime.fromisoformat(sent.replace("Z", "+00:00")).astimezone(timezone.utc)
     except Exception:
         return False
-    if not (DATE_START <= sent_dt <= DATE_END):
+    if (start and sent_dt < start) or (end and sent_dt > end):
         return False
 
     area = (props.get("areaDesc") or "").lower()
@@ -63,74 +150,61 @@ def build_raw_text(props: Dict[str, Any]) -> str:
     return "\n\n".join(parts) if parts else ""
 
 
+def feature_to_row(feature: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    props = feature.get("properties", {})
+    alert_id = props.get("id") or feature.get("id")
+    if not alert_id:
+        return None
+
+    source_url = props.get("id") or ""
+    published_at_raw = props.get("sent") or props.get("onset")
+    if not published_at_raw:
+        return None
+    try:
+        published_at = datetime.fromisoformat(published_at_raw.replace("Z", "+00:00")).astimezone(timezone.utc)
+    except Exception:
+        return None
+
+    return bulk.raw_update_row(
+        source=SOURCE_NAME,
+        item_id=alert_id,
+        source_url=source_url,
+        published_at=published_at,
+        raw_text=build_raw_text(props),
+    )
+
+
+class NWSAdapter(SourceAdapter):
+    name = SOURCE_NAME
+
+    def __init__(self) -> None:
+        self.cache = ConditionalCache(HTTP_CACHE_DIR) if HTTP_CACHE_DIR else None
+
+    def fetch_rows(self, since: Optional[datetime] = None) -> Optional[List[Dict[str, Any]]]:
+        start = max(since, DATE_START) if since else DATE_START
+        if start >= DATE_END:
+            return []
+
+        features = fetch_alerts(start=start, cache=self.cache)
+        if features is None:
+            return None
+        logger.info("Fetched %d alerts from NWS API", len(features))
+
+        rows = []
+        for feature in features:
+            if not within_scope(feature):
+                continue
+            row = feature_to_row(feature)
+            if row:
+                rows.append(row)
+        return rows
+
+
+ADAPTER = register(NWSAdapter())
+
+
 def ingest() -> None:
-    session = SessionLocal()
-    inserted = 0
-    skipped = 0
-
-    features = fetch_alerts()
-    logger.info("Fetched %d alerts from NWS API", len(features))
-
-    for feature in features:
-        if not within_scope(feature):
-            continue
-
-        props = feature.get("properties", {})
-        alert_id = props.get("id") or feature.get("id")
-        if not alert_id:
-            continue
-
-        source_url = props.get("id") or ""
-        published_at_raw = props.get("sent") or props.get("onset")
-        if not published_at_raw:
-            continue
-        try:
-            published_at = datetime.fromisoformat(published_at_raw.replace("Z", "+00:00")).astimezone(timezone.utc)
-        except Exception:
-            continue
-
-        raw_text = build_raw_text(props)
-        raw_html = None
-        content_hash = sha256(raw_text.encode("utf-8")).hexdigest()
-
-        exists = (
-            session.query(models.RawUpdate)
-            .filter(
-                models.RawUpdate.source == SOURCE_NAME,
-                models.RawUpdate.source_item_id == alert_id,
-            )
-            .one_or_none()
-        )
-        if exists:
-            skipped += 1
-            logger.info("Skip duplicate alert_id=%s", alert_id)
-            continue
-
-        record = models.RawUpdate(
-            id=alert_id,
-            source=SOURCE_NAME,
-            source_url=source_url,
-            source_item_id=alert_id,
-            published_at=published_at,
-            raw_text=raw_text,
-            raw_html=raw_html,
-            content_hash=content_hash,
-        )
-        session.add(record)
-        try:
-            session.commit()
-            inserted += 1
-            logger.info("Inserted alert_id=%s", alert_id)
-        except IntegrityError:
-            session.rollback()
-            skipped += 1
-            logger.info("Skip duplicate on commit alert_id=%s", alert_id)
-        except Exception as exc:  # pragma: no cover
-            session.rollback()
-            logger.error("Failed to insert alert_id=%s: %s", alert_id, exc)
-
-    logger.info("Done. Inserted=%d skipped=%d", inserted, skipped)
-    session.close()
+    ADAPTER.ingest()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,25 @@
+import importlib
+import pkgutil
+from typing import Dict, List
+
+from pipeline.ingest.base import SourceAdapter
+
+ADAPTERS: Dict[str, SourceAdapter] = {}
+
+
+def register(adapter: SourceAdapter) -> SourceAdapter:
+    if not adapter.name:
+        raise ValueError("Source adapters need a name")
+    if adapter.name in ADAPTERS and ADAPTERS[adapter.name] is not adapter:
+        raise ValueError(f"Duplicate source adapter: {adapter.name}")
+    ADAPTERS[adapter.name] = adapter
+    return adapter
+
+
+def discover() -> List[SourceAdapter]:
+    # Every module in pipeline.ingest registers its adapter on import, so a
+    # new source only needs a new module here.
+    package = importlib.import_module("pipeline.ingest")
+    for module in pkgutil.iter_modules(package.__path__):
+        importlib.import_module(f"{package.__name__}.{module.name}")
+    return list(ADAPTERS.values())
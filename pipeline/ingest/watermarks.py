@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend.app import models
+
+
+def load(session: Session, source: str) -> Optional[datetime]:
+    watermark = session.get(models.IngestWatermark, source)
+    return watermark.last_published_at if watermark else None
+
+
+def advance(session: Session, source: str, rows: Sequence[Dict[str, Any]]) -> None:
+    # Runs inside the caller's transaction so the watermark only moves when
+    # the batch it covers is committed. The WHERE clause keeps it monotonic
+    # even if an older batch commits after a newer one.
+    if not rows:
+        return
+    newest = max(rows, key=lambda row: (row["published_at"], row["source_item_id"]))
+
+    table = models.IngestWatermark.__table__
+    stmt = pg_insert(table).values(
+        source=source,
+        last_published_at=newest["published_at"],
+        cursor=newest["source_item_id"],
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.source],
+        set_={
+            "last_published_at": stmt.excluded.last_published_at,
+            "cursor": stmt.excluded.cursor,
+            "updated_at": func.now(),
+        },
+        where=table.c.last_published_at.is_(None) | (table.c.last_published_at <= stmt.excluded.last_published_at),
+    )
+    session.execute(stmt)
@@ -0,0 +1,79 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.app.db import SessionLocal  # noqa: E402
+from backend.app import models  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+URGENCY_ORDER = ["high", "medium", "low"]
+
+
+def time_to_card(since: datetime, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    # Seconds from a raw update landing to its card existing, per urgency,
+    # over the raw updates that landed since `since`. Cards rebuilt by
+    # reextract count from their original landing and are left out by
+    # keeping `since` after the last rule change.
+    lag = func.extract("epoch", models.Card.created_at - models.RawUpdate.fetched_at)
+    stmt = (
+        select(
+            models.Card.urgency,
+            func.count(),
+            func.percentile_cont(0.5).within_group(lag),
+            func.percentile_cont(0.95).within_group(lag),
+            func.max(lag),
+        )
+        .join(models.CleanUpdate, models.CleanUpdate.id == models.Card.clean_update_id)
+        .join(models.RawUpdate, models.RawUpdate.id == models.CleanUpdate.raw_update_id)
+        .where(models.RawUpdate.fetched_at >= since, models.Card.created_at.is_not(None))
+        .group_by(models.Card.urgency)
+    )
+    if mode:
+        stmt = stmt.where(models.Card.mode == mode)
+
+    session = SessionLocal()
+    try:
+        rows = session.execute(stmt).all()
+    finally:
+        session.close()
+    rows.sort(key=lambda row: URGENCY_ORDER.index(row[0]) if row[0] in URGENCY_ORDER else len(URGENCY_ORDER))
+    return [
+        {
+            "urgency": urgency,
+            "cards": count,
+            "p50_seconds": round(float(p50), 2),
+            "p95_seconds": round(float(p95), 2),
+            "max_seconds": round(float(worst), 2),
+        }
+        for urgency, count, p50, p95, worst in rows
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Report time from landing to card per urgency level.")
+    parser.add_argument("--since-hours", type=float, default=24.0, help="raw updates landed within this many hours")
+    parser.add_argument("--mode", choices=["action", "info"], default=None)
+    args = parser.parse_args(argv)
+    since = datetime.now(timezone.utc) - timedelta(hours=args.since_hours)
+
+    print(f"{'urgency':<8} {'cards':>8} {'p50 s':>9} {'p95 s':>9} {'max s':>9}")
+    for row in time_to_card(since, args.mode):
+        print(
+            f"{row['urgency']:<8} {row['cards']:>8} {row['p50_seconds']:>9.2f} "
+            f"{row['p95_seconds']:>9.2f} {row['max_seconds']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
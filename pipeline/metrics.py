@@ -0,0 +1,193 @@
+import cProfile
+import json
+import logging
+import os
+import resource
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from backend.app.db import SessionLocal, engine
+from backend.app import models
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PIPELINE_RUNS_DIR = os.getenv("PIPELINE_RUNS_DIR", os.path.join(ROOT_DIR, ".cache", "runs"))
+
+
+class DBCounter:
+    # Statements sent through the shared engine and the time spent in them,
+    # across all threads. Row batches fetched from a server-side cursor are
+    # not counted separately.
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        self.seconds = 0.0
+
+    def before(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        with self.lock:
+            self.round_trips += 1
+            self.seconds += elapsed
+
+    def snapshot(self) -> tuple:
+        with self.lock:
+            return self.round_trips, self.seconds
+
+
+DB = DBCounter()
+event.listen(engine, "before_cursor_execute", DB.before)
+event.listen(engine, "after_cursor_execute", DB.after)
+
+
+def cpu_seconds() -> float:
+    # This process plus finished pool workers.
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def peak_rss_mb() -> float:
+    # High-water mark so far, not per stage; ru_maxrss is in kilobytes on
+    # Linux.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+class StageMetrics:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.rows = 0
+        self.details: Dict[str, Any] = {}
+        self.status = "ok"
+        self.profile_path: Optional[str] = None
+        self._wall = time.perf_counter()
+        self._cpu = cpu_seconds()
+        self._db = DB.snapshot()
+        self.record: Dict[str, Any] = {}
+
+    def finish(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._wall
+        round_trips, db_seconds = DB.snapshot()
+        self.record = {
+            "name": self.name,
+            "status": self.status,
+            "rows": self.rows,
+            "wall_seconds": round(wall, 4),
+            "cpu_seconds": round(cpu_seconds() - self._cpu, 4),
+            "rows_per_second": round(self.rows / wall, 1) if wall > 0 else 0.0,
+            "db_round_trips": round_trips - self._db[0],
+            "db_seconds": round(db_seconds - self._db[1], 4),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+        if self.details:
+            self.record["details"] = self.details
+        if self.profile_path:
+            self.record["profile"] = self.profile_path
+        return self.record
+
+
+class RunRecorder:
+    # One structured record per pipeline run: a row in pipeline_runs plus
+    # <PIPELINE_RUNS_DIR>/<run id>.json. With profile=True every stage also
+    # leaves a cProfile dump next to it (main thread only; ingest fetches
+    # run in worker threads and are not in it).
+    def __init__(self, mode: str = "batch", profile: bool = False, out_dir: str = PIPELINE_RUNS_DIR) -> None:
+        self.run_id = uuid.uuid4().hex
+        self.mode = mode
+        self.profile = profile
+        self.out_dir = out_dir
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: List[Dict[str, Any]] = []
+        self.sections: Dict[str, Any] = {}
+        self.total = StageMetrics("run")
+
+    def attach(self, name: str, value: Any) -> None:
+        # Extra named section for the report.
+        self.sections[name] = value
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        metrics = StageMetrics(name)
+        profiler = cProfile.Profile() if self.profile else None
+        if profiler:
+            profiler.enable()
+        try:
+            yield metrics
+        except BaseException:
+            metrics.status = "failed"
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(os.path.join(self.out_dir, self.run_id), exist_ok=True)
+                metrics.profile_path = os.path.join(self.out_dir, self.run_id, f"{name}.prof")
+                profiler.dump_stats(metrics.profile_path)
+            record = metrics.finish()
+            self.stages.append(record)
+            logger.info(
+                "Stage %s: %d rows in %.2fs (%.0f rows/s, cpu %.2fs, %d DB round trips / %.2fs, peak RSS %.0f MB)",
+                name,
+                record["rows"],
+                record["wall_seconds"],
+                record["rows_per_second"],
+                record["cpu_seconds"],
+                record["db_round_trips"],
+                record["db_seconds"],
+                record["peak_rss_mb"],
+            )
+
+    def report(self, status: str) -> Dict[str, Any]:
+        # Stages count different things, so the run total has no row count.
+        self.total.status = status
+        total = self.total.finish()
+        del total["rows"], total["rows_per_second"]
+        return {
+            "run_id": self.run_id,
+            "mode": self.mode,
+            "status": status,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "total": total,
+            "stages": self.stages,
+            **self.sections,
+        }
+
+    def finish(self, status: str = "ok") -> Dict[str, Any]:
+        report = self.report(status)
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"{self.run_id}.json")
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+        session = SessionLocal()
+        try:
+            session.add(
+                models.PipelineRun(
+                    id=self.run_id,
+                    mode=self.mode,
+                    status=status,
+                    started_at=self.started_at,
+                    finished_at=datetime.fromisoformat(report["finished_at"]),
+                    wall_seconds=report["total"]["wall_seconds"],
+                    report=report,
+                )
+            )
+            session.commit()
+        except Exception as exc:  # pragma: no cover
+            session.rollback()
+            logger.error("Could not store pipeline run %s: %s", self.run_id, exc)
+        finally:
+            session.close()
+        logger.info("Run %s %s in %.2fs; report at %s", self.run_id, status, report["total"]["wall_seconds"], path)
+        return report
@@ -0,0 +1,39 @@
+import os
+import re
+from typing import Dict
+
+from pipeline.extract.rules import ACTION_KEYWORDS, URGENCY_HIGH
+
+# A cheap guess at how urgent a raw update is, made when it lands so the
+# clean and extract queues can serve the likely urgent rows first. It reads
+# the same vocabularies the classifier does but only asks whether any
+# pattern matches, in one pass per list; the classifier still decides.
+HIGH_WEIGHT = 4
+ACTION_WEIGHT = 2
+
+_HIGH = re.compile("|".join(f"(?:{pattern})" for pattern in URGENCY_HIGH))
+_ACTION = re.compile("|".join(f"(?:{pattern})" for pattern in ACTION_KEYWORDS))
+
+
+def parse_source_weights(value: str) -> Dict[str, int]:
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            weights[name.strip()] = int(weight or 0)
+    return weights
+
+
+# Extra priority per source, as "Source Name=weight,...". NWS warnings are
+# the life-safety feed, so they go first among equals.
+SOURCE_WEIGHTS = parse_source_weights(os.getenv("SOURCE_WEIGHTS", "NWS=1"))
+
+
+def prescore(text: str, source: str) -> int:
+    lowered = text.lower()
+    score = SOURCE_WEIGHTS.get(source, 0)
+    if _HIGH.search(lowered):
+        score += HIGH_WEIGHT
+    if _ACTION.search(lowered):
+        score += ACTION_WEIGHT
+    return score
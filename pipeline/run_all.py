@@ -1,24 +1,155 @@
-from pipeline.ingest import nws, broward, miamidade, fldem
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pipeline.ingest import registry
+from pipeline.ingest.base import SourceAdapter
 from pipeline.clean import clean_text
-from pipeline.extract import extract_cards
+from pipeline.extract import extract_cards, reextract
 from pipeline.dedup import dedup
+from pipeline.latency import time_to_card
+from pipeline.metrics import RunRecorder, StageMetrics
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+
+
+# Fetches that outlived their timeout, by source. They run on in daemon
+# threads, so they neither hold up the process exit nor land twice: a source
+# whose last fetch is still going is left out of the next ingest.
+_running: Dict[str, threading.Thread] = {}
+
+
+def ingest_all(
+    adapters: Optional[List[SourceAdapter]] = None,
+    workers: int = INGEST_WORKERS,
+    sink: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> Dict[str, Tuple[int, int]]:
+    adapters = adapters if adapters is not None else registry.discover()
+    if not adapters:
+        return {}
+
+    finished = threading.Condition()
+    outcomes: Dict[str, Any] = {}
+
+    def run_source(adapter: SourceAdapter) -> None:
+        try:
+            outcome = adapter.ingest(sink)
+        except Exception as exc:
+            outcome = exc
+        with finished:
+            outcomes[adapter.name] = outcome
+            finished.notify()
+
+    queued = []
+    for adapter in adapters:
+        previous = _running.get(adapter.name)
+        if previous is not None and previous.is_alive():
+            logger.warning("Source %s is still running from an earlier ingest; skipping it", adapter.name)
+            continue
+        queued.append(adapter)
 
+    # At most `workers` sources run at once. Each source's deadline starts
+    # when it does, so one slow feed cannot eat into the others' budgets,
+    # and a source that times out gives its slot to the next in line.
+    limit = workers or len(adapters)
+    active: Dict[str, Tuple[SourceAdapter, threading.Thread, float]] = {}
+    results: Dict[str, Tuple[int, int]] = {}
+    with finished:
+        while queued or active:
+            while queued and len(active) < limit:
+                adapter = queued.pop(0)
+                thread = threading.Thread(
+                    target=run_source, args=(adapter,), name=f"ingest-{adapter.name}", daemon=True
+                )
+                thread.start()
+                active[adapter.name] = (adapter, thread, time.monotonic() + adapter.timeout)
 
-def main() -> None:
-    # Run ingestion steps sequentially.
-    nws.ingest()
-    broward.ingest()
-    miamidade.ingest()
-    fldem.ingest()
+            now = time.monotonic()
+            for name, (adapter, thread, deadline) in list(active.items()):
+                if name in outcomes:
+                    del active[name]
+                    _running.pop(name, None)
+                    if isinstance(outcomes[name], Exception):
+                        logger.error("Source %s failed: %s", name, outcomes[name])
+                    else:
+                        results[name] = outcomes[name]
+                elif now >= deadline:
+                    del active[name]
+                    _running[name] = thread
+                    logger.warning("Source %s timed out after %.0fs; continuing without it", name, adapter.timeout)
+
+            if active and not (queued and len(active) < limit):
+                finished.wait(max(min(deadline for _, _, deadline in active.values()) - time.monotonic(), 0))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run ingest, clean, extract and dedup.")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="hand each source's new rows through the stages in micro-batches instead of stage by stage",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="write a cProfile dump per stage next to the run report",
+    )
+    args = parser.parse_args(argv)
+    recorder = RunRecorder("stream" if args.stream else "batch", args.profile)
+    try:
+        if args.stream:
+            run_stream(recorder)
+        else:
+            run_batch(recorder)
+        recorder.attach("time_to_card", time_to_card(recorder.started_at))
+    except BaseException:
+        recorder.finish("failed")
+        raise
+    recorder.finish()
+
+
+def record_ingest(metrics: StageMetrics, results: Dict[str, Tuple[int, int]]) -> None:
+    metrics.rows = sum(inserted for inserted, _ in results.values())
+    metrics.details = {
+        name: {"inserted": inserted, "skipped": skipped} for name, (inserted, skipped) in results.items()
+    }
+
+
+def run_batch(recorder: RunRecorder) -> None:
+    # Ingest all registered sources concurrently.
+    with recorder.stage("ingest") as metrics:
+        record_ingest(metrics, ingest_all())
 
     # Cleaning step
-    clean_text.ingest_clean()
+    with recorder.stage("clean") as metrics:
+        metrics.rows = clean_text.ingest_clean()
 
-    # Extraction step
-    extract_cards.extract()
+    # Extraction step: bring cards made under older rules up to date, then
+    # extract the new clean updates.
+    with recorder.stage("reextract") as metrics:
+        metrics.rows = reextract.reextract()
+    with recorder.stage("extract") as metrics:
+        metrics.rows = extract_cards.extract()
 
     # Deduplication step
-    dedup.deduplicate()
+    with recorder.stage("dedup") as metrics:
+        metrics.rows = dedup.deduplicate()
+
+
+def run_stream(recorder: RunRecorder) -> None:
+    # The streamed stages overlap, so they are measured as one.
+    from pipeline import stream
+
+    with recorder.stage("reextract") as metrics:
+        metrics.rows = reextract.reextract()
+    with recorder.stage("stream") as metrics:
+        record_ingest(metrics, stream.StreamPipeline().run())
 
 
 if __name__ == "__main__":
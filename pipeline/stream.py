@@ -0,0 +1,222 @@
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.app.db import SessionLocal  # noqa: E402
+from backend.app import models  # noqa: E402
+from pipeline import bulk, run_all, workqueue  # noqa: E402
+from pipeline.cache import clean_cache  # noqa: E402
+from pipeline.clean import clean_text  # noqa: E402
+from pipeline.dedup import dedup  # noqa: E402
+from pipeline.extract import extract_cards, reextract  # noqa: E402
+from pipeline.ingest.base import SourceAdapter  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+# A stage takes up to STREAM_BATCH_SIZE rows at a time, coalescing whatever
+# is already waiting. Each hand-off queue holds at most STREAM_QUEUE_SIZE
+# batches; a full queue blocks the stage feeding it, all the way back to
+# ingest, so memory stays bounded when a later stage falls behind.
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "8"))
+
+# (monotonic time the oldest row landed in raw_updates, rows)
+Batch = Tuple[float, List[Any]]
+
+
+class Stage(threading.Thread):
+    def __init__(
+        self,
+        name: str,
+        handle: Callable[[Session, List[Any]], List[Any]],
+        inbox: "queue.Queue[Optional[Batch]]",
+        outbox: "Optional[queue.Queue[Optional[Batch]]]" = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> None:
+        super().__init__(name=f"stream-{name}", daemon=True)
+        self.stage = name
+        self.handle = handle
+        self.inbox = inbox
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.processed = 0
+        self.emitted = 0
+
+    def take(self) -> Tuple[Optional[Batch], bool]:
+        # Blocks for one batch, then tops it up from what is already queued.
+        # Returns (batch, finished); batch is None once the stream has ended.
+        first = self.inbox.get()
+        if first is None:
+            return None, True
+        landed, rows = first[0], list(first[1])
+        while len(rows) < self.batch_size:
+            try:
+                more = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if more is None:
+                return (landed, rows), True
+            landed = min(landed, more[0])
+            rows.extend(more[1])
+        return (landed, rows), False
+
+    def run(self) -> None:
+        session = SessionLocal()
+        try:
+            finished = False
+            while not finished:
+                batch, finished = self.take()
+                if batch is None:
+                    break
+                landed, rows = batch
+                try:
+                    out = self.handle(session, rows)
+                    session.commit()
+                except Exception as exc:  # pragma: no cover
+                    # The rows stay pending in the database; a batch run
+                    # picks them up.
+                    session.rollback()
+                    logger.error("Stream stage %s failed on %d rows: %s", self.stage, len(rows), exc)
+                    continue
+                self.processed += len(rows)
+                self.emitted += len(out)
+                if self.outbox is not None:
+                    if out:
+                        self.outbox.put((landed, out))
+                else:
+                    logger.info(
+                        "%s: %d rows %.2fs after landing", self.stage, len(rows), time.monotonic() - landed
+                    )
+        finally:
+            session.close()
+            if self.outbox is not None:
+                self.outbox.put(None)
+
+
+class StreamPipeline:
+    # Ingest -> clean -> extract -> dedup as threads joined by bounded
+    # queues. Each stage hands on exactly the rows it wrote, so nothing scans
+    # for pending work: a source's rows are cards as soon as that source has
+    # landed them, whatever the other sources are doing.
+    def __init__(
+        self,
+        batch_size: int = STREAM_BATCH_SIZE,
+        queue_size: int = STREAM_QUEUE_SIZE,
+        dedup_mode: str = dedup.DEDUP_MODE,
+    ) -> None:
+        self.batch_size = batch_size
+        self.near = dedup_mode == "near"
+        self.closed = threading.Event()
+        self.clean_cache = clean_cache()
+        session = SessionLocal()
+        try:
+            self.classification_cache = extract_cards.prepare_classification(session)
+        finally:
+            session.close()
+
+        self.raw: "queue.Queue[Optional[Batch]]" = queue.Queue(maxsize=queue_size)
+        self.cleaned: "queue.Queue[Optional[Batch]]" = queue.Queue(maxsize=queue_size)
+        self.cards: "queue.Queue[Optional[Batch]]" = queue.Queue(maxsize=queue_size)
+        self.stages = [
+            Stage("clean", self.clean, self.raw, self.cleaned, batch_size),
+            Stage("extract", self.extract, self.cleaned, self.cards, batch_size),
+            Stage("dedup", self.dedup, self.cards, None, batch_size),
+        ]
+
+    def sink(self, rows: List[Dict[str, Any]]) -> None:
+        # Called from the ingest threads with freshly committed raw rows.
+        landed = time.monotonic()
+        for batch in bulk.chunked(rows, self.batch_size):
+            while True:
+                if self.closed.is_set():
+                    logger.warning("Stream closed; %d raw updates left for the next batch run", len(batch))
+                    return
+                try:
+                    self.raw.put((landed, batch), timeout=1)
+                    break
+                except queue.Full:
+                    continue
+
+    def clean(self, session: Session, raw_rows: List[Dict[str, Any]]) -> List[Tuple]:
+        rows = [(row["id"], row["raw_text"], row["raw_html"], row["content_hash"]) for row in raw_rows]
+        records = clean_text.clean_chunk(session, rows, self.clean_cache)
+        written = set(bulk.insert_ignore(session, models.CleanUpdate, records))
+        # Handled here, so no batch worker picks them up again.
+        workqueue.complete(session, "clean", [row[0] for row in rows])
+        raw_by_id = {row["id"]: row for row in raw_rows}
+        out = []
+        for record in records:
+            if record["id"] not in written:
+                continue
+            raw = raw_by_id[record["raw_update_id"]]
+            out.append(
+                (
+                    record["id"],
+                    record["cleaned_text"],
+                    record["cleaned_hash"],
+                    raw["source"],
+                    raw["source_url"],
+                    raw["published_at"],
+                )
+            )
+        return out
+
+    def extract(self, session: Session, rows: List[Tuple]) -> List[str]:
+        records = extract_cards.extract_chunk(session, rows, self.classification_cache)
+        placed = extract_cards.settle(session, records, self.classification_cache.scope["rules_fingerprint"])
+        return bulk.insert_ignore(session, models.Card, placed)
+
+    def dedup(self, session: Session, card_ids: List[str]) -> List[Any]:
+        # Waits out a batch dedup run (or the daemon's) rather than dropping
+        # the batch; cards that run grouped are no longer pending below.
+        dedup.lock(session)
+        rows = []
+        for batch in bulk.chunked(card_ids, bulk.BATCH_SIZE):
+            rows.extend(session.execute(dedup.pending_cards(self.near).where(models.Card.id.in_(batch))).all())
+        rows.sort(key=lambda row: (row.published_at, row.id))
+        if rows:
+            dedup.dedup_chunk(session, rows, self.near)
+        return rows
+
+    def run(self, adapters: Optional[List[SourceAdapter]] = None) -> Dict[str, Tuple[int, int]]:
+        for stage in self.stages:
+            stage.start()
+        try:
+            results = run_all.ingest_all(adapters, sink=self.sink)
+        finally:
+            # Sources that timed out may still land rows later; those are left
+            # pending rather than pushed into a stream that is shutting down.
+            self.closed.set()
+            self.raw.put(None)
+            for stage in self.stages:
+                stage.join()
+
+        logger.info(
+            "Stream done. cleaned=%d cards=%d grouped=%d",
+            self.stages[0].emitted,
+            self.stages[1].emitted,
+            self.stages[2].emitted,
+        )
+        return results
+
+
+def run(adapters: Optional[List[SourceAdapter]] = None) -> Dict[str, Tuple[int, int]]:
+    # Cards made under older rules are brought up to date first, as in the
+    # batch pipeline; everything else flows through the stream.
+    reextract.reextract()
+    return StreamPipeline().run(adapters)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,212 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+from html import escape
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.app.db import SessionLocal  # noqa: E402
+from pipeline import bulk  # noqa: E402
+from pipeline.backfill import copy_merge, parse_ts  # noqa: E402
+from pipeline.extract import gazetteer, rules  # noqa: E402
+from pipeline.ingest import nws  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+COUNTY_SOURCES = {
+    "broward": "Broward County EM",
+    "miami-dade": "Miami-Dade EM",
+}
+STATEWIDE_SOURCES = ["NWS", "FL DEM"]
+DUPLICATE_POOL = 1000
+
+FILLER = [
+    "Residents should monitor official channels for updates.",
+    "Call 311 for non-emergency assistance.",
+    "Conditions will be reassessed after the storm passes.",
+    "Updates will be posted every six hours.",
+    "Crews are on standby across the county.",
+    "Please check on elderly neighbors.",
+]
+TIMES = ["at 6 PM today", "until further notice", "beginning at noon", "through Friday", "overnight"]
+
+_GROUP = re.compile(r"\(([^()]*)\)(\?)?")
+_CLASS = re.compile(r"\[([^\]]*)\]")
+_OPTIONAL_CHAR = re.compile(r"(\w)\?")
+
+
+def phrase_from_pattern(pattern: str, rng: random.Random) -> str:
+    # Turns the simple regexes used in rules.py into a literal phrase that
+    # the pattern matches, so the corpus follows the live vocabulary.
+    text = pattern.replace(r"\b", "")
+    while True:
+        match = _GROUP.search(text)
+        if not match:
+            break
+        options = match.group(1).split("|")
+        choice = "" if match.group(2) and rng.random() < 0.5 else rng.choice(options)
+        text = text[: match.start()] + choice + text[match.end() :]
+    text = _CLASS.sub(lambda m: rng.choice(m.group(1)), text)
+    text = _OPTIONAL_CHAR.sub(lambda m: m.group(1) if rng.random() < 0.5 else "", text)
+    return text
+
+
+def weighted_choice(weights: Dict[str, float], rng: random.Random) -> str:
+    names = list(weights)
+    return rng.choices(names, weights=[weights[name] for name in names])[0]
+
+
+def build_document(rng: random.Random, county: str) -> Tuple[str, List[str]]:
+    sentences = []
+    place = rng.choice(gazetteer.GAZETTEER.cities(county))
+
+    if rng.random() < 0.6:
+        action = phrase_from_pattern(rng.choice(rules.ACTION_KEYWORDS), rng)
+        sentences.append(f"{place}: {action.capitalize()} {rng.choice(TIMES)}.")
+    else:
+        sentences.append(f"{place} situation update {rng.choice(TIMES)}.")
+
+    category, patterns = rng.choice(rules.CATEGORY_KEYWORDS)
+    subject = phrase_from_pattern(rng.choice(patterns), rng)
+    sentences.append(f"Officials report {subject} updates for {place} residents.")
+
+    roll = rng.random()
+    if roll < 0.2:
+        sentences.append(f"This is {phrase_from_pattern(rng.choice(rules.URGENCY_HIGH), rng)}.")
+    elif roll < 0.6:
+        sentences.append(f"Impacts are {phrase_from_pattern(rng.choice(rules.URGENCY_MEDIUM), rng)}.")
+
+    if rng.random() < 0.5:
+        _, type_patterns = rng.choice(rules.ACTION_TYPE_PATTERNS)
+        sentences.append(f"Details: {phrase_from_pattern(rng.choice(type_patterns), rng)}.")
+
+    sentences.extend(rng.sample(FILLER, rng.randint(1, 3)))
+    return " ".join(sentences), sentences
+
+
+def to_html(sentences: List[str], rng: random.Random) -> str:
+    items = "".join(f"<li>{escape(s)}</li>" for s in sentences[1:])
+    extra = "<script>trackPage();</script>" if rng.random() < 0.3 else ""
+    return f"<div class=\"update\"><h2>{escape(sentences[0])}</h2>{extra}<ul>{items}</ul><!-- generated --></div>"
+
+
+def generate(
+    count: int,
+    seed: int = 0,
+    duplicate_rate: float = 0.1,
+    html_ratio: float = 0.3,
+    county_weights: Optional[Dict[str, float]] = None,
+    statewide_rate: float = 0.2,
+    start: datetime = nws.DATE_START,
+    spread: timedelta = nws.DATE_END - nws.DATE_START,
+) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    county_weights = county_weights or {"broward": 0.5, "miami-dade": 0.5}
+    recent: List[Tuple[str, Optional[str]]] = []
+
+    for index in range(count):
+        county = weighted_choice(county_weights, rng)
+        if rng.random() < statewide_rate:
+            source = rng.choice(STATEWIDE_SOURCES)
+        else:
+            source = COUNTY_SOURCES.get(county, f"{county.replace('-', ' ').title()} County EM")
+
+        if recent and rng.random() < duplicate_rate:
+            # A verbatim re-post of something already published.
+            raw_text, raw_html = rng.choice(recent)
+        else:
+            raw_text, sentences = build_document(rng, county)
+            raw_html = to_html(sentences, rng) if rng.random() < html_ratio else None
+            if len(recent) < DUPLICATE_POOL:
+                recent.append((raw_text, raw_html))
+            else:
+                recent[rng.randrange(DUPLICATE_POOL)] = (raw_text, raw_html)
+
+        item_id = f"synthetic-{seed}-{index}"
+        yield bulk.raw_update_row(
+            source=source,
+            item_id=item_id,
+            source_url=f"https://synthetic.invalid/{source.lower().replace(' ', '-')}/{item_id}",
+            published_at=start + timedelta(seconds=rng.uniform(0, spread.total_seconds())),
+            raw_text=raw_text,
+            raw_html=raw_html,
+        )
+
+
+def write_jsonl(rows: Iterator[Dict[str, Any]], path: str) -> int:
+    written = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps({**row, "published_at": row["published_at"].isoformat()}) + "\n")
+            written += 1
+    return written
+
+
+def write_db(rows: Iterator[Dict[str, Any]], batch_size: int = 10000) -> int:
+    inserted = 0
+    session = SessionLocal()
+    try:
+        for batch in bulk.chunked(rows, batch_size):
+            inserted += copy_merge(session, batch)
+            session.commit()
+            logger.info("Loaded %d synthetic rows", inserted)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return inserted
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if not gazetteer.GAZETTEER.cities(name.strip()):
+            raise argparse.ArgumentTypeError(f"Unknown county or no cities in the gazetteer: {name}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic corpus of raw updates.")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--html-ratio", type=float, default=0.3)
+    parser.add_argument("--counties", type=parse_weights, default=None, help="e.g. broward=0.7,miami-dade=0.3")
+    parser.add_argument("--statewide-rate", type=float, default=0.2, help="Share attributed to NWS / FL DEM")
+    parser.add_argument("--start", default=nws.DATE_START.isoformat())
+    parser.add_argument("--hours", type=float, default=(nws.DATE_END - nws.DATE_START).total_seconds() / 3600)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="Write JSON lines to this file")
+    target.add_argument("--to-db", action="store_true", help="Load straight into raw_updates")
+    args = parser.parse_args(argv)
+
+    rows = generate(
+        args.count,
+        seed=args.seed,
+        duplicate_rate=args.duplicate_rate,
+        html_ratio=args.html_ratio,
+        county_weights=args.counties,
+        statewide_rate=args.statewide_rate,
+        start=parse_ts(args.start),
+        spread=timedelta(hours=args.hours),
+    )
+    if args.out:
+        logger.info("Wrote %d synthetic rows to %s", write_jsonl(rows, args.out), args.out)
+    else:
+        logger.info("Done. Inserted=%d", write_db(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+from typing import Any, Collection, List, Optional, Sequence
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from pipeline import bulk
+
+# Rows waiting for a stage, one work_queue row each (migration 0011):
+# inserts into raw_updates queue "clean" work, inserts into clean_updates
+# queue "extract" work. Workers claim a batch with FOR UPDATE SKIP LOCKED
+# inside the transaction that writes its results and delete the items
+# before committing, so concurrent workers never take the same row and a
+# worker that dies simply releases its batch.
+#
+# Claims go highest priority first (the raw update's prescore, see
+# pipeline.priority), oldest first within a priority, so likely urgent rows
+# jump a backlog.
+#
+# Every item carries a bucket, hashtext(item_id) & (BUCKETS - 1), computed
+# by the database. Worker k of n takes the buckets b with b % n == k; without
+# a shard a worker takes any bucket, and SKIP LOCKED alone keeps it clear
+# of the others.
+BUCKETS = 1024
+
+
+def shard_buckets(shard: Optional[int], shards: int) -> Optional[List[int]]:
+    if shard is None or shards <= 1:
+        return None
+    if not 0 <= shard < shards:
+        raise ValueError(f"shard must be in [0, {shards}), got {shard}")
+    return list(range(shard, BUCKETS, shards))
+
+
+def claim(
+    stmt: Any,
+    stage: str,
+    limit: int,
+    buckets: Optional[List[int]] = None,
+    skip: Collection[str] = (),
+) -> Any:
+    # `stmt` selects a stage's input joined to WorkItem on item_id; the
+    # result locks up to `limit` unclaimed items. `skip` holds items that
+    # already failed in this run, so a bad batch is not retried in a loop.
+    item = models.WorkItem
+    stmt = stmt.where(item.stage == stage, item.parked_under.is_(None))
+    if buckets is not None:
+        stmt = stmt.where(item.bucket.in_(buckets))
+    if skip:
+        stmt = stmt.where(item.item_id.not_in(list(skip)))
+    return (
+        stmt.order_by(item.priority.desc(), item.enqueued_at)
+        .limit(limit)
+        .with_for_update(of=item, skip_locked=True)
+    )
+
+
+def complete(session: Session, stage: str, ids: Sequence[str]) -> None:
+    for batch in bulk.chunked(ids, bulk.BATCH_SIZE):
+        session.execute(
+            delete(models.WorkItem).where(models.WorkItem.stage == stage, models.WorkItem.item_id.in_(batch))
+        )
+
+
+def park(session: Session, stage: str, ids: Sequence[str], fingerprint: str) -> None:
+    # Items the stage looked at but could not use under the current rules
+    # (clean updates with no county): kept, but not claimable until the
+    # rules change.
+    for batch in bulk.chunked(ids, bulk.BATCH_SIZE):
+        session.execute(
+            update(models.WorkItem)
+            .where(models.WorkItem.stage == stage, models.WorkItem.item_id.in_(batch))
+            .values(parked_under=fingerprint)
+        )
+
+
+def enqueue_parked(session: Session, stage: str, ids: Sequence[str], fingerprint: str) -> None:
+    # Queue items that are already known to be unusable under `fingerprint`.
+    rows = [{"stage": stage, "item_id": item_id, "parked_under": fingerprint} for item_id in ids]
+    bulk.insert_ignore(session, models.WorkItem, rows, key_column="item_id")
+    park(session, stage, ids, fingerprint)
+
+
+def unpark(session: Session, stage: str, fingerprint: str) -> int:
+    # Items parked under any other rule set get another look.
+    result = session.execute(
+        update(models.WorkItem)
+        .where(
+            models.WorkItem.stage == stage,
+            models.WorkItem.parked_under.is_not(None),
+            models.WorkItem.parked_under != fingerprint,
+        )
+        .values(parked_under=None)
+    )
+    return result.rowcount